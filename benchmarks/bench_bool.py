@@ -0,0 +1,41 @@
+"""bench_bool
+Micro-benchmarks for BoolCheck and utils.get_bool.
+
+    python benchmarks/bench_bool.py [number]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from xcheck import BoolCheck
+from xcheck.utils import get_bool
+
+TOKENS = ['true', 'False', 'YES', 'n', '1', '0', 'T', 'y', True, False]
+
+
+def main(number=5000):
+    flag = BoolCheck('flag')
+
+    def check_content():
+        for token in TOKENS:
+            flag.check_content(token)
+
+    def call():
+        for token in TOKENS:
+            flag(token, normalize=True)
+
+    def parse():
+        for token in TOKENS:
+            get_bool(token)
+
+    for label, func in [('check_content', check_content),
+                        ('__call__', call),
+                        ('get_bool', parse)]:
+        best = min(timeit.repeat(func, number=number, repeat=5))
+        print '%-14s %d values: %.4fs' % (label, number * len(TOKENS), best)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
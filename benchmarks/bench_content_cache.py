@@ -0,0 +1,66 @@
+"""bench_content_cache
+Times a document whose leaf values repeat, like status codes, currency
+codes, flags and dates, with the content cache off and on.
+
+    python benchmarks/bench_content_cache.py [records] [number]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import xcheck
+from xcheck import XCheck, TextCheck, SelectionCheck, BoolCheck, IntCheck
+from xcheck import DecimalCheck, DatetimeCheck
+from xcheck.core import ET, check_node
+
+STATUS = ['open', 'closed', 'pending', 'void']
+CURRENCY = ['USD', 'EUR', 'GBP', 'JPY', 'CHF']
+DATES = ['2014-03-%02d' % day for day in range(1, 29)]
+
+
+def build(records):
+    "returns a checker for an export and a matching node"
+    record = XCheck('record', max_occurs=records)
+    record.addattribute(SelectionCheck('status', values=STATUS))
+    record.addattribute(SelectionCheck('currency', values=CURRENCY))
+    record.add_child(TextCheck('code', pattern=r'[A-Z]{3}-\d{3}',
+        full_match=True))
+    record.add_child(BoolCheck('paid'))
+    record.add_child(IntCheck('quantity', min=0, max=100))
+    record.add_child(DecimalCheck('amount', min=0))
+    record.add_child(DatetimeCheck('date', format='%b %d, %Y',
+        formats=['%Y-%m-%d']))
+    checker = XCheck('export', children=[record])
+
+    node = ET.Element('export')
+    for idx in range(records):
+        child = ET.SubElement(node, 'record', status=STATUS[idx % 4],
+            currency=CURRENCY[idx % 5])
+        ET.SubElement(child, 'code').text = 'ABC-%03d' % (idx % 20)
+        ET.SubElement(child, 'paid').text = ['yes', 'no'][idx % 2]
+        ET.SubElement(child, 'quantity').text = str(idx % 10)
+        ET.SubElement(child, 'amount').text = '%d.50' % (idx % 50)
+        ET.SubElement(child, 'date').text = DATES[idx % 28]
+    return checker, node
+
+
+def main(records=2000, number=5):
+    checker, node = build(records)
+    plan = checker.compile()
+
+    for maxsize in [0, 4096]:
+        xcheck.set_content_cache(maxsize)
+        assert check_node(checker, node) == []
+        for label, func in [('check_node', lambda: check_node(checker, node)),
+                            ('plan.check', lambda: plan.check(node))]:
+            best = min(timeit.repeat(func, number=number, repeat=5))
+            print 'cache %-5d %-11s %d records x %d: %.4fs' % (
+                maxsize, label, records, number, best)
+    print xcheck.content_cache_info()
+    xcheck.set_content_cache(0)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,49 @@
+"""bench_int
+Micro-benchmarks for IntCheck on integer strings, float strings and large
+IDs.
+
+    python benchmarks/bench_int.py [number]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from xcheck import IntCheck
+
+SAMPLES = [
+    ('integer strings', ['1', '42', '-7', '1000', '65535', '123456']),
+    ('float strings', ['1.0', '42.0', '-7.0', '1e3', '65535.0', '2.5e2']),
+    ('large ids', ['9007199254740993', '12345678901234567891',
+                   '98765432109876543210', '18446744073709551615']),
+    ('integers', [1, 42, -7, 1000, 65535, 123456]),
+]
+
+
+def main(number=5000):
+    checker = IntCheck('id')
+
+    for label, values in SAMPLES:
+        def check_content():
+            for value in values:
+                checker.check_content(value)
+
+        def call():
+            for value in values:
+                checker(value, normalize=True)
+
+        for name, func in [('check_content', check_content),
+                           ('__call__', call)]:
+            best = min(timeit.repeat(func, number=number, repeat=5))
+            print '%-16s %-14s %d values: %.4fs' % (
+                label, name, number * len(values), best)
+
+    # exactness check for the large IDs
+    for value in SAMPLES[2][1]:
+        if checker(value, normalize=True) != int(value):
+            print 'inexact:', value
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,40 @@
+"""bench_patterns
+Times TextCheck against a schema with several hundred distinct patterns,
+more than the re module caches.
+
+    python benchmarks/bench_patterns.py [patterns] [items]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from xcheck import XCheck, TextCheck
+from xcheck.core import ET, check_node
+
+
+def build(patterns):
+    "returns a checker with one TextCheck per pattern, and a matching node"
+    checker = XCheck('record')
+    node = ET.Element('record')
+    for idx in range(patterns):
+        name = 'field%d' % idx
+        checker.add_child(TextCheck(name, pattern=r'^f%d-[a-z]+\d*$' % idx))
+        ET.SubElement(node, name).text = 'f%d-value%d' % (idx, idx)
+    return checker, node
+
+
+def main(patterns=500, items=20):
+    checker, node = build(patterns)
+    plan = checker.compile()
+    assert check_node(checker, node) == []
+
+    for label, func in [('check_node', lambda: check_node(checker, node)),
+                        ('plan.check', lambda: plan.check(node))]:
+        best = min(timeit.repeat(func, number=items, repeat=5))
+        print '%-12s %d patterns x %d: %.4fs' % (label, patterns, items, best)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
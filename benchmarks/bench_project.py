@@ -0,0 +1,83 @@
+"""bench_project
+Times an export job that reads the fields of every record, one getter per
+field against Wrap._project and Wrap._to_record.
+
+    python benchmarks/bench_project.py [records] [number]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from xcheck import XCheck, TextCheck, EmailCheck, SelectionCheck, BoolCheck
+from xcheck import IntCheck, DecimalCheck, DatetimeCheck, Wrap
+from xcheck.core import ET
+
+STATUS = ['open', 'closed', 'pending', 'void']
+FIELDS = ['code', 'name', 'email', 'status', 'paid', 'quantity', 'amount',
+    'date', 'city', 'zip']
+
+
+def build(records):
+    "returns a checker for an export and a matching node"
+    address = XCheck('address', children=[TextCheck('city'),
+        TextCheck('zip', pattern=r'\d{5}')])
+    record = XCheck('record', max_occurs=records, children=[
+        TextCheck('name', min_length=1), EmailCheck('email'),
+        BoolCheck('paid'), IntCheck('quantity', min=0),
+        DecimalCheck('amount', min=0),
+        DatetimeCheck('date', format='%Y-%m-%d'), address])
+    record.addattribute(IntCheck('code'))
+    record.addattribute(SelectionCheck('status', values=STATUS))
+    checker = XCheck('export', children=[record])
+
+    node = ET.Element('export')
+    for idx in range(records):
+        child = ET.SubElement(node, 'record', code=str(idx),
+            status=STATUS[idx % 4])
+        ET.SubElement(child, 'name').text = 'Customer %d' % idx
+        ET.SubElement(child, 'email').text = 'c%d@example.com' % idx
+        ET.SubElement(child, 'paid').text = ['yes', 'no'][idx % 2]
+        ET.SubElement(child, 'quantity').text = str(idx % 10)
+        ET.SubElement(child, 'amount').text = '%d.50' % (idx % 50)
+        ET.SubElement(child, 'date').text = '2014-03-%02d' % (idx % 28 + 1)
+        address = ET.SubElement(child, 'address')
+        ET.SubElement(address, 'city').text = 'Podunk'
+        ET.SubElement(address, 'zip').text = '%05d' % idx
+    return checker, node
+
+
+def by_getters(records):
+    rows = []
+    for rec in records:
+        row = []
+        for name in FIELDS:
+            if name in ('code', 'status'):
+                row.append(rec._get_att(name))
+            else:
+                row.append(rec._get_elem_value(name))
+        rows.append(tuple(row))
+    return rows
+
+
+def main(records=100000, number=1):
+    checker, node = build(records)
+    # the export was built here, so it is not checked again
+    export = Wrap(checker, node, 'trusted')
+    wraps = export.record
+    assert by_getters(wraps[:10]) == [rec._project(FIELDS)
+        for rec in wraps[:10]]
+
+    for label, func in [
+            ('getters', lambda: by_getters(wraps)),
+            ('project', lambda: [rec._project(FIELDS) for rec in wraps]),
+            ('to_record', lambda: [rec._to_record() for rec in wraps])]:
+        # each wrap keeps the values it has read, so time fresh ones
+        best = min(timeit.repeat(func, number=number, repeat=3,
+            setup=lambda: [rec._changed() for rec in wraps]))
+        print '%-10s %d records x %d: %.3fs' % (label, records, number, best)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,64 @@
+"""bench_wrap
+Micro-benchmarks for reading fields through Wrap.
+
+    python benchmarks/bench_wrap.py [number]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from xcheck import XCheck, TextCheck, EmailCheck, IntCheck, BoolCheck
+from xcheck import SelectionCheck, DatetimeCheck, Wrap
+
+
+def build(addresses=3):
+    "returns a person checker and a matching XML string"
+    first = TextCheck('first', min_length=1)
+    first.addattribute(BoolCheck('nick', required=False))
+    name = XCheck('name', children=[first, TextCheck('last', min_length=1),
+        IntCheck('code', max_occurs=5),
+        DatetimeCheck('born', format='%B %d, %Y')])
+    email = EmailCheck('email', max_occurs=2)
+    email.addattribute(SelectionCheck('type',
+        values=['home', 'work', 'personal']))
+    address = XCheck('address', max_occurs=addresses, children=[
+        TextCheck('street'), TextCheck('city'), email])
+    person = XCheck('person', children=[name, address])
+    person.addattribute(IntCheck('id'))
+
+    text = ['<person id="1"><name><first nick="yes">Josh</first>'
+        '<last>English</last><code>12</code><code>42</code>'
+        '<born>March 22, 1975</born></name>']
+    for idx in range(addresses):
+        text.append('<address><street>%d Main St</street><city>Podunk</city>'
+            '<email type="home">dude%d@example.com</email></address>'
+            % (idx, idx))
+    text.append('</person>')
+    return person, ''.join(text)
+
+
+def main(number=2000):
+    person, text = build()
+    wrap = Wrap(person, text)
+
+    for label, func in [
+            ('Wrap()', lambda: Wrap(person, text)),
+            ('Wrap() lazy', lambda: Wrap(person, text, 'lazy')),
+            ('Wrap() trusted', lambda: Wrap(person, text, 'trusted')),
+            ('text field', lambda: wrap.first),
+            ('attribute', lambda: wrap.id),
+            ('nested field', lambda: wrap.last),
+            ('list field', lambda: wrap.code),
+            ('child wrap', lambda: wrap.name),
+            ('child wraps', lambda: wrap.address),
+            ('int value', lambda: wrap._get_elem_value('code', 1)),
+            ('date value', lambda: wrap._get_elem_value('born')),
+            ('bool attribute', lambda: wrap._get_elem_att('first', 'nick'))]:
+        best = min(timeit.repeat(func, number=number, repeat=5))
+        print '%-15s %d reads: %.4fs' % (label, number, best)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -4,6 +4,12 @@ import xcheck
 class ComplexError(xcheck.XCheckError): pass
 
 class ComplexCheck(xcheck.XCheck):
+    # options given to __call__. Each call sees its own values, so a
+    # checker can be shared between threads
+    as_string = xcheck.CallOption('as_string')
+    as_complex = xcheck.CallOption('as_complex')
+    as_tuple = xcheck.CallOption('as_tuple')
+
     def __init__(self, name, **kwargs):
         self.allow_none = kwargs.pop('allow_none', True)
         if 'error' not in kwargs:
@@ -14,16 +20,16 @@ class ComplexCheck(xcheck.XCheck):
         self._object_atts.extend(['allow_none'])
 
     def __call__(self, item, **kwargs):
-        self._as_string = kwargs.pop('as_string', False)
-        self._as_complex = kwargs.pop('as_complex', False)
-        self._as_tuple = kwargs.pop('as_tuple', False)
+        options = {}
+        for option in ('as_string', 'as_complex', 'as_tuple'):
+            options[option] = kwargs.pop(option, False)
 
-        if any((self._as_string, self._as_complex, self._as_tuple)):
+        if any(options.values()):
             kwargs['normalize'] = True
         else:
             kwargs['normalize'] = False
 
-        return xcheck.XCheck.__call__(self, item, **kwargs)
+        return self._call(item, options, **kwargs)
 
     def check_content(self, item):
         ok = None
@@ -44,8 +50,8 @@ class ComplexCheck(xcheck.XCheck):
         # handle everything else
         if ok is None:
             try:
-                self._value = complex(item)
-                self._normalized_value = self.normalize_content()
+                value = complex(item)
+                self._normalized_value = self.normalize_content(value)
                 ok = True
             except Exception as E:
                 ok = False
@@ -53,15 +59,15 @@ class ComplexCheck(xcheck.XCheck):
 
         return ok
 
-    def normalize_content(self):
-        if self._as_string:
-            return str(self._value)
-        elif self._as_complex:
-            return self._value
-        elif self._as_tuple:
-            return (self._value.real, self._value.imag)
+    def normalize_content(self, value):
+        if self.as_string:
+            return str(value)
+        elif self.as_complex:
+            return value
+        elif self.as_tuple:
+            return (value.real, value.imag)
         else:
-            return self._value # always returns the complex number
+            return value # always returns the complex number
 
 ET = xcheck.ET
 import unittest
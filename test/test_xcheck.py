@@ -9,6 +9,9 @@ except:
     import xml.etree.ElementTree as ET
 
 import datetime
+import os
+import StringIO
+import tempfile
 import time
 
 import xcheck
@@ -477,6 +480,12 @@ class EmailCheckTC(unittest.TestCase):
         "EmailCheck() allows an empty string if allow_blank is true"
         self.assertTrue(self.b(' '))
 
+    def testNoPattern(self):
+        "EmailCheck() uses the default email pattern if pattern is None"
+        self.t.pattern = None
+        self.assertTrue(self.t('me@example.com'))
+        self.assertRaises(self.t.error, self.t, 'not an address')
+
 class IntCheckTC(unittest.TestCase):
     "These test if the defaults are created properly"
     def setUp(self):
@@ -1319,6 +1328,315 @@ class XChildWrapTC(unittest.TestCase):
         "getattr returns a wrap instance when necessary"
         self.assertIsInstance(self.w.name, Wrap)
 
+class WrapFieldTC(unittest.TestCase):
+    def setUp(self):
+        self.check = XCheck('dude', children=[name])
+        self.text = """<dude>
+        <name><first nick="yes">Josh</first><last>English</last>
+        <code>12</code><code word="answer">42</code></name>
+        </dude>"""
+
+    def test_generated_class(self):
+        w = Wrap(self.check, self.text)
+        self.assertTrue(isinstance(w, Wrap))
+        self.assertTrue(type(w) is not Wrap)
+        self.assertTrue(type(Wrap(self.check, self.text)) is type(w))
+        for token in ['first', 'nick', 'code', 'word', 'name']:
+            self.assertTrue(isinstance(type(w).__dict__[token],
+                xcheck.wrap.Field))
+
+    def test_fields(self):
+        w = Wrap(self.check, self.text)
+        self.assertEqual(w.first, 'Josh')
+        self.assertEqual(w.nick, 'yes')
+        self.assertEqual(w.code, ['12', '42'])
+        self.assertEqual(w.word, 'answer')
+        self.assertEqual(w.name.last, 'English')
+        self.assertEqual(w.name._elem.tag, 'name')
+
+    def test_subclass_names_are_kept(self):
+        class Dude(Wrap):
+            def __init__(self, node=None):
+                Wrap.__init__(self, self_check, node)
+
+            @property
+            def first(self):
+                return self._get_elem_value('first').upper()
+
+        self_check = self.check
+        dude = Dude(self.text)
+        self.assertTrue(isinstance(dude, Dude))
+        self.assertEqual(dude.first, 'JOSH')
+        self.assertEqual(dude.last, 'English')
+
+    def test_schema_change(self):
+        w = Wrap(self.check, self.text)
+        self.check.add_child(TextCheck('note', min_occurs=0))
+        self.assertEqual(w.first, 'Josh')
+        self.assertEqual(w.note, None)
+        w = Wrap(self.check, self.text.replace('</dude>',
+            '<note>hi</note></dude>'))
+        self.assertEqual(w.note, 'hi')
+
+    def test_duplicated_tag_name(self):
+        check = XCheck('contact', children=[
+            XCheck('home', children=[TextCheck('city')]),
+            XCheck('work', children=[TextCheck('city')])])
+        w = Wrap(check, '<contact><home><city>Here</city></home>'
+            '<work><city>There</city></work></contact>')
+        self.assertFalse('city' in type(w).__dict__)
+        self.assertEqual(w.home.city, 'Here')
+        self.assertEqual(w.work.city, 'There')
+
+class WrapValidateTC(unittest.TestCase):
+    def setUp(self):
+        # the second address has no street
+        self.bad = dudeText.replace('<street>318 West Nowhere Ln</street>', '')
+
+    def test_eager(self):
+        self.assertRaises(XCheckError, Wrap, dude, self.bad)
+        self.assertRaises(XCheckError, Wrap, dude, self.bad, 'eager')
+        self.assertTrue(Wrap(dude, dudeText)._validated)
+
+    def test_lazy(self):
+        w = Wrap(dude, self.bad, validate='lazy')
+        self.assertFalse(w._validated)
+        self.assertRaises(XCheckError, getattr, w, 'first')
+        self.assertRaises(XCheckError, w._get_elem_value, 'first')
+        self.assertRaises(XCheckError, w._set_elem_value, 'first', 'Joe')
+        self.assertRaises(XCheckError, w._validate)
+
+        w = Wrap(dude, dudeText, validate='lazy')
+        self.assertFalse(w._validated)
+        self.assertEqual(w.first, 'Josh')
+        self.assertTrue(w._validated)
+
+    def test_explicit_validate(self):
+        w = Wrap(dude, dudeText, validate='lazy')
+        w._validate()
+        self.assertTrue(w._validated)
+        w._elem.find('name/first').text = ''
+        self.assertRaises(XCheckError, w._validate)
+
+    def test_trusted(self):
+        w = Wrap(dude, self.bad, validate='trusted')
+        self.assertTrue(w._validated)
+        self.assertEqual(w.first, 'Josh')
+        self.assertEqual(len(w.address), 2)
+
+    def test_child_wraps_are_trusted(self):
+        w = Wrap(dude, dudeText)
+        for child in w.address + [w.name, w._get_child_wrap('address', 1)]:
+            self.assertTrue(child._validated)
+        self.assertEqual(w.address[1].city, 'East Podunk')
+
+    def test_mismatched_child_is_not_trusted(self):
+        check = XCheck('r', children=[
+            XCheck('it', children=[TextCheck('r')])])
+        w = Wrap(check, '<r><it><r>hello</r></it></r>')
+        self.assertRaises(MismatchedTagError, getattr, w, 'r')
+
+    def test_added_child_is_checked(self):
+        w = Wrap(dude, dudeText)
+        w._add_elem('address', '')
+        self.assertRaises(XCheckError, w._get_child_wrap, 'address', 2)
+        self.assertRaises(XCheckError, getattr, w, 'address')
+        self.assertEqual(w._get_child_wrap('address', 0).city, 'Podunk')
+
+    def test_field_named_validate(self):
+        check = XCheck('job', children=[BoolCheck('validate')])
+        w = Wrap(check, '<job><validate>yes</validate></job>', 'lazy')
+        self.assertEqual(w.validate, 'yes')
+
+    def test_bad_mode(self):
+        self.assertRaises(ValueError, Wrap, dude, dudeText, 'later')
+
+class WrapChildCacheTC(unittest.TestCase):
+    def setUp(self):
+        self.w = Wrap(dude, dudeText)
+
+    def test_same_wraps(self):
+        addresses = self.w.address
+        self.assertEqual(len(addresses), 2)
+        for old, new in zip(addresses, self.w.address):
+            self.assertTrue(old is new)
+        self.assertTrue(self.w.name is self.w.name)
+        self.assertTrue(self.w._get_child_wrap('address', 1) is addresses[1])
+
+    def test_list_is_a_copy(self):
+        self.w.address.pop()
+        self.assertEqual(len(self.w.address), 2)
+
+    def test_add_elem(self):
+        addresses = self.w.address
+        new = self.w._add_elem('address', '')
+        for tag in ['street', 'city', 'email']:
+            ET.SubElement(new, tag).text = 'x@example.com'
+        new.find('email').set('type', 'home')
+        now = self.w.address
+        self.assertEqual(len(now), 3)
+        self.assertFalse(now[0] is addresses[0])
+        self.assertTrue(now[2]._elem is new)
+
+    def test_setters(self):
+        for setter, args in [
+                (self.w._set_elem_value, ('first', 'Joe')),
+                (self.w._set_elem_att, ('first', 'nick', False)),
+                (self.w._set_att, ('id', 2))]:
+            name = self.w.name
+            setter(*args)
+            self.assertFalse(self.w.name is name)
+        self.assertEqual(self.w.name.first, 'Joe')
+
+    def test_replaced_element(self):
+        first = self.w.address[0]
+        elem = self.w._elem
+        elem.remove(first._elem)
+        self.assertEqual(self.w.address[0].city, 'East Podunk')
+
+class WrapValueCacheTC(unittest.TestCase):
+    def setUp(self):
+        class CountingCheck(IntCheck):
+            calls = 0
+            def check_content(self, item):
+                CountingCheck.calls += 1
+                return IntCheck.check_content(self, item)
+
+        self.counter = CountingCheck
+        code = CountingCheck('code', max_occurs=3)
+        code.addattribute(CountingCheck('rank', required=False))
+        part = XCheck('part', children=[code], max_occurs=2)
+        self.check = XCheck('order', children=[
+            part, ListCheck('tags', values=['a', 'b', 'c'])])
+        self.check.addattribute(CountingCheck('number'))
+        self.w = Wrap(self.check, """<order number="7">
+            <part><code rank="1">12</code><code>42</code></part>
+            <part><code>5</code></part><tags>a,b</tags></order>""")
+        self.counter.calls = 0
+
+    def test_repeated_reads(self):
+        for x in range(3):
+            self.assertEqual(self.w._get_elem_value('code'), 12)
+            self.assertEqual(self.w._get_elem_value('code', 1), 42)
+            self.assertEqual(self.w._get_elem_att('code', 'rank'), 1)
+            self.assertEqual(self.w._get_att('number'), 7)
+        self.assertEqual(self.counter.calls, 4)
+
+    def test_options(self):
+        self.assertEqual(self.w._get_elem_value('code'), 12)
+        self.assertEqual(self.w._get_elem_value('code', as_string=True), '12')
+        self.assertEqual(self.w._get_elem_value('code', normalize=False), '12')
+        self.assertEqual(self.w._get_elem_value('code'), 12)
+        self.assertEqual(self.counter.calls, 2)
+
+    def test_set_drops_only_that_value(self):
+        self.w._get_elem_value('code')
+        self.w._get_elem_value('code', 1)
+        self.w._set_elem_value('code', 13)
+        calls = self.counter.calls
+        self.assertEqual(self.w._get_elem_value('code', 1), 42)
+        self.assertEqual(self.counter.calls, calls)
+        self.assertEqual(self.w._get_elem_value('code'), 13)
+
+        self.w._set_elem_att('code', 'rank', 2)
+        self.assertEqual(self.w._get_elem_att('code', 'rank'), 2)
+        self.w._set_att('number', 8)
+        self.assertEqual(self.w._get_att('number'), 8)
+        self.assertEqual(self.w._get_elem_att('order', 'number'), 8)
+
+    def test_child_and_parent(self):
+        part = self.w.part[0]
+        self.assertEqual(part._get_elem_value('code'), 12)
+        self.assertEqual(self.w._get_elem_value('code'), 12)
+        part._set_elem_value('code', 99)
+        self.assertEqual(self.w._get_elem_value('code'), 99)
+        self.w._set_elem_value('code', 98)
+        self.assertEqual(part._get_elem_value('code'), 98)
+
+    def test_lists_are_copies(self):
+        tags = self.w._get_elem_value('tags')
+        self.assertEqual(tags, ['a', 'b'])
+        tags.append('c')
+        self.assertEqual(self.w._get_elem_value('tags'), ['a', 'b'])
+
+    def test_direct_changes(self):
+        self.assertEqual(self.w._get_elem_value('code'), 12)
+        self.w._elem.find('part/code').text = '11'
+        self.w._changed()
+        self.assertEqual(self.w._get_elem_value('code'), 11)
+
+class WrapProjectTC(unittest.TestCase):
+    def setUp(self):
+        self.w = Wrap(dude, dudeText)
+
+    def test_project(self):
+        self.assertEqual(self.w._project(['first', 'code', 'nick', 'id']),
+            ('Josh', [12, 42], True, 1))
+        self.assertEqual(self.w._project(['street', 'type']),
+            ('100 Main St', 'home'))
+        self.assertEqual(self.w._project([]), ())
+
+    def test_as_dict(self):
+        self.assertEqual(self.w._project(('last', 'word'), as_dict=True),
+            {'last': 'English', 'word': 'answer'})
+
+    def test_missing_values(self):
+        w = Wrap(dude, dudeText.replace(' nick="true"', ''))
+        self.assertEqual(w._project(['nick', 'first']), (None, 'Josh'))
+
+    def test_bad_names(self):
+        self.assertRaises(ValueError, self.w._project, ['first', 'pp'])
+        self.assertRaises(ValueError, self.w._project, ['address'])
+
+    def test_to_record(self):
+        record = self.w.address[1]._to_record()
+        self.assertEqual(record, {'street': '318 West Nowhere Ln',
+            'city': 'East Podunk', 'email': ['dude@home.net'],
+            'type': 'personal'})
+        self.assertEqual(sorted(self.w._to_record()), ['city', 'code', 'email',
+            'first', 'id', 'last', 'nick', 'street', 'type', 'word'])
+
+    def test_duplicated_tag_name(self):
+        check = XCheck('contact', children=[TextCheck('name'),
+            XCheck('home', children=[TextCheck('city')]),
+            XCheck('work', children=[TextCheck('city')])])
+        w = Wrap(check, '<contact><name>Josh</name><home><city>Here</city>'
+            '</home><work><city>There</city></work></contact>')
+        self.assertEqual(w._to_record(), {'name': 'Josh'})
+        self.assertRaises(ValueError, w._project, ['name', 'city'])
+        self.assertEqual(w.work._to_record(), {'city': 'There'})
+
+    def test_fields_named_like_the_helpers(self):
+        check = XCheck('job', children=[TextCheck('project'),
+            TextCheck('to_record')])
+        w = Wrap(check, '<job><project>P</project><to_record>R</to_record>'
+            '</job>')
+        self.assertEqual((w.project, w.to_record), ('P', 'R'))
+        self.assertEqual(w._to_record(), {'project': 'P', 'to_record': 'R'})
+
+    def test_getter_call_options(self):
+        check = XCheck('order', children=[ListCheck('items', as_string=True),
+            IntCheck('count', as_string=True),
+            DatetimeCheck('when', format='%Y-%m-%d')])
+        w = Wrap(check, '<order><items>a, b</items><count>2</count>'
+            '<when>2014-03-22</when></order>')
+        self.assertEqual(w._project(['items', 'count', 'when']),
+            tuple(w._get_elem_value(name)
+                for name in ['items', 'count', 'when']))
+        self.assertEqual(w._project(['items', 'count']), (['a', 'b'], 2))
+
+    def test_leaf_root(self):
+        w = Wrap(fname, '<first nick="no">Josh</first>')
+        self.assertEqual(w._to_record(), {'first': 'Josh', 'nick': False})
+
+    def test_schema_change(self):
+        check = XCheck('thing', children=[TextCheck('item')])
+        w = Wrap(check, '<thing><item>one</item><note>hi</note></thing>',
+            'trusted')
+        self.assertEqual(w._to_record(), {'item': 'one'})
+        check.add_child(TextCheck('note', min_occurs=0))
+        self.assertEqual(w._to_record(), {'item': 'one', 'note': 'hi'})
+
 class DummyValueTC(unittest.TestCase):
     def test_Datetimedummy(self):
         "DatetimeCheck.dummy_value() should return the minimum date"
@@ -1937,6 +2255,72 @@ class TestXPathTo(unittest.TestCase):
             self.assertEqual(dude.xpath_to(token), path)
 
 
+class TestPathIndex(unittest.TestCase):
+    def test_path_info(self):
+        info = dude.path_info('nick')
+        self.assertIs(info.checker, nick)
+        self.assertEqual(info.dotted_path, 'dude.name.first.nick')
+        self.assertEqual(info.xpath, './name/first[@nick]')
+        self.assertTrue(info.is_att)
+        self.assertIs(info.parent, fname)
+
+        info = dude.path_info('address')
+        self.assertIs(info.checker, address)
+        self.assertFalse(info.is_att)
+        self.assertIs(info.parent, dude)
+
+    def test_unknown_name(self):
+        info = dude.path_info('mystery')
+        self.assertIsNone(info.checker)
+        self.assertIsNone(info.xpath)
+        self.assertFalse(dude.is_att('mystery'))
+
+    def test_index_is_reused(self):
+        self.assertIs(dude.path_info('first'), dude.path_info('first'))
+
+    def test_grandchild_invalidates_index(self):
+        top = XCheck('top')
+        middle = XCheck('middle')
+        top.add_child(middle)
+        self.assertIsNone(top.get('leaf'))
+        self.assertIsNone(top.xpath_to('flag'))
+
+        leaf = TextCheck('leaf')
+        middle.add_child(leaf)
+        leaf.addattribute(BoolCheck('flag'))
+        self.assertIs(top.get('leaf'), leaf)
+        self.assertEqual(top.xpath_to('flag'), './middle/leaf[@flag]')
+        self.assertIn('top.middle.leaf.flag', top.get_all_paths())
+
+    def test_other_trees_keep_their_index(self):
+        info = dude.path_info('first')
+        other = XCheck('other')
+        other.add_child(XCheck('first'))
+        other.get('first').min_occurs = 0
+        self.assertIs(dude.path_info('first'), info)
+        self.assertIs(Wrap._wrap_class(dude), Wrap._wrap_class(dude))
+
+    def test_shared_child_invalidates_both_trees(self):
+        shared = XCheck('shared')
+        one, two = XCheck('one'), XCheck('two')
+        one.add_child(shared)
+        two.add_child(shared)
+        self.assertIsNone(one.get('leaf'))
+        self.assertIsNone(two.get('leaf'))
+        shared.add_child(TextCheck('leaf'))
+        self.assertIsNotNone(one.get('leaf'))
+        self.assertIsNotNone(two.get('leaf'))
+
+    def test_pickled_tree_keeps_parent_links(self):
+        import pickle
+        top = XCheck('top')
+        top.add_child(XCheck('middle'))
+        copy = pickle.loads(pickle.dumps(top, 2))
+        self.assertIsNone(copy.get('leaf'))
+        copy.get('middle').add_child(TextCheck('leaf'))
+        self.assertEqual(copy.xpath_to('leaf'), './middle/leaf')
+
+
 class TestNewGet(unittest.TestCase):
     def test_newget(self):
         oops = XCheck('oops')
@@ -2139,6 +2523,731 @@ class CheckNodeOrderedChildren(unittest.TestCase):
         res = check_node_ordered_children(self.ch, node)
         self.assertEqual(len(res), 0)
 
+class CompiledPlanTC(unittest.TestCase):
+    def setUp(self):
+        self.plan = dude.compile()
+
+    def tearDown(self):
+        del self.plan
+
+    def assertSameErrors(self, node):
+        expected = [(type(e), str(e)) for e in check_node(dude, node)]
+        found = [(type(e), str(e)) for e in self.plan.check(node)]
+        self.assertListEqual(found, expected)
+
+    def test_valid_node(self):
+        self.assertListEqual(self.plan.check(dudeNode), [])
+        self.assertTrue(self.plan(dudeNode))
+        self.assertTrue(self.plan(dudeText))
+
+    def test_same_errors(self):
+        for text in ['<dude />',
+                '<dude id="x" extra="1"><name><first>a</first></name></dude>',
+                '<dude id="1"><mystery/><name><code>1.5</code></name></dude>',
+                '<dude id="1"><address><email type="bad">x</email></address>'
+                    '<name><first nick="maybe"/><last/><code/></name></dude>',
+                '<name><first>Josh</first></name>']:
+            self.assertSameErrors(ET.fromstring(text))
+
+    def test_unordered(self):
+        ch = XCheck('test', ordered=False)
+        ch.add_child(XCheck('a'), XCheck('b', min_occurs=0, max_occurs=2))
+        node = ET.fromstring('<test><b/><b/><b/><c/></test>')
+        expected = [(type(e), str(e)) for e in check_node(ch, node)]
+        found = [(type(e), str(e)) for e in ch.compile().check(node)]
+        self.assertListEqual(found, expected)
+
+    def test_raises_first_error(self):
+        self.assertRaises(MissingAttributeError, self.plan,
+            '<dude><name><first>a</first><last>b</last><code>1</code></name>'
+            '<address><street>s</street><city>c</city>'
+            '<email type="home">a@b.com</email></address></dude>')
+
+    def test_plan_is_a_snapshot(self):
+        ch = XCheck('test')
+        plan = ch.compile()
+        ch.add_child(XCheck('kid'))
+        self.assertTrue(plan('<test/>'))
+        self.assertRaises(MissingChildError, ch.compile(), '<test/>')
+
+    def test_steps_are_read_only(self):
+        step = self.plan.steps[0]
+        self.assertRaises(AttributeError, setattr, step, 'name', 'oops')
+
+    def test_lookups_are_kept(self):
+        node = ET.fromstring(dudeText.replace('</dude>',
+            '<extra/><extra/></dude>'))
+        self.assertSameErrors(node)
+        self.assertSameErrors(node)
+        self.assertEqual(len(self.plan._lookups), 1)
+
+class CountingCheck(TextCheck):
+    "TextCheck that counts calls to check_content"
+    calls = 0
+    def check_content(self, item):
+        CountingCheck.calls += 1
+        return TextCheck.check_content(self, item)
+
+class MaxErrorsTC(unittest.TestCase):
+    def setUp(self):
+        self.ch = XCheck('list')
+        self.ch.add_child(CountingCheck('item', min_length=2, max_occurs=100))
+        self.node = ET.fromstring(
+            '<list>%s</list>' % ('<item>x</item>' * 50))
+        CountingCheck.calls = 0
+
+    def tearDown(self):
+        del self.ch
+        del self.node
+
+    def test_all_errors(self):
+        self.assertEqual(len(check_node(self.ch, self.node)), 50)
+        self.assertEqual(CountingCheck.calls, 50)
+
+    def test_max_errors(self):
+        res = check_node(self.ch, self.node, max_errors=3)
+        self.assertEqual(len(res), 3)
+        self.assertEqual(CountingCheck.calls, 3)
+
+    def test_max_errors_keeps_order(self):
+        node = ET.fromstring('<dude id="x" bad="1"><name/></dude>')
+        everything = check_node(dude, node)
+        for n in range(1, len(everything) + 1):
+            res = check_node(dude, node, max_errors=n)
+            self.assertListEqual([str(e) for e in res],
+                [str(e) for e in everything[:n]])
+
+    def test_fail_fast(self):
+        self.assertRaises(self.ch.error, self.ch, self.node, fail_fast=True)
+        self.assertEqual(CountingCheck.calls, 1)
+
+    def test_call_with_max_errors(self):
+        self.assertRaises(self.ch.error, self.ch, self.node, max_errors=5)
+        self.assertEqual(CountingCheck.calls, 5)
+
+    def test_plain_values(self):
+        number = IntCheck('n', min=5)
+        self.assertEqual(number('7', normalize=True), 7)
+        self.assertRaises(number.error, number, '3', max_errors=2)
+        self.assertRaises(ValueError, number, '7', max_errors=0)
+        self.assertTrue(TextCheck('t')('a < b'))
+        self.assertRaises(UnexpectedChildError, XCheck('x'), '<x><y/></x>')
+
+    def test_compiled_plan(self):
+        plan = self.ch.compile()
+        self.assertEqual(len(plan.check(self.node, max_errors=2)), 2)
+        self.assertRaises(self.ch.error, plan, self.node, fail_fast=True)
+        self.assertEqual(CountingCheck.calls, 3)
+
+    def test_helpers(self):
+        node = ET.fromstring('<a x="1" y="2" z="3"/>')
+        self.assertEqual(len(check_attributes(XCheck('a'), node)), 3)
+        self.assertEqual(
+            len(check_attributes(XCheck('a'), node, max_errors=1)), 1)
+        ch = XCheck('a')
+        ch.add_child(XCheck('b'), XCheck('c'), XCheck('d'))
+        node = ET.fromstring('<a/>')
+        self.assertEqual(len(check_node_ordered_children(ch, node)), 3)
+        self.assertEqual(
+            len(check_node_ordered_children(ch, node, max_errors=2)), 2)
+        ch.ordered = False
+        self.assertEqual(
+            len(check_node_unordered_children(ch, node, max_errors=1)), 1)
+
+    def test_bad_max_errors(self):
+        self.assertRaises(ValueError, check_node, self.ch, self.node, 0)
+
+
+class UnorderedCountTC(unittest.TestCase):
+    def setUp(self):
+        self.ch = XCheck('a', ordered=False)
+        self.ch.add_child(XCheck('b'), XCheck('c', max_occurs=2))
+
+    def errors(self, text):
+        return [str(e) for e in
+            check_node_unordered_children(self.ch, ET.fromstring(text))]
+
+    def test_valid(self):
+        self.assertEqual(self.errors('<a><c/><b/><c/></a>'), [])
+
+    def test_limits(self):
+        self.assertEqual(sorted(self.errors('<a><c/><c/><c/></a>')),
+            ["Not enough 'b' children in 'a' node",
+             "Too many 'c' children in 'a' node"])
+
+    def test_unknown_tags(self):
+        self.assertEqual(self.errors('<a><x/><b/><c/><y/><x/></a>'),
+            ['Undexpected "x" child in "a" node',
+             'Undexpected "y" child in "a" node',
+             'Undexpected "x" child in "a" node'])
+
+    def test_unknown_tags_reported_once(self):
+        errors = [str(e) for e in
+            check_node(self.ch, ET.fromstring('<a><b/><c/><x/></a>'))]
+        self.assertEqual(errors, ['Undexpected "x" child in "a" node',
+            'None is not an XCheck instance'])
+        self.assertEqual(len(check_node(self.ch,
+            ET.fromstring('<a><b/><c/><x/></a>'), max_errors=1)), 1)
+
+    def test_unknown_tags_in_plans_and_streams(self):
+        text = '<a><x/><b/><c/><x/></a>'
+        expected = [str(e) for e in check_node(self.ch, ET.fromstring(text))]
+        self.assertEqual(expected.count('Undexpected "x" child in "a" node'),
+            2)
+        self.assertEqual([str(e) for e in
+            self.ch.compile().check(ET.fromstring(text))], expected)
+        # streams add structure errors when the element ends
+        self.assertEqual(sorted(str(e) for e in
+            check_stream(self.ch, StringIO.StringIO(text))), sorted(expected))
+
+
+class StreamTC(unittest.TestCase):
+    def setUp(self):
+        self.ch = XCheck('feed')
+        item = XCheck('item', min_occurs=0, max_occurs=100)
+        item.addattribute(IntCheck('id'))
+        item.add_child(TextCheck('name'), IntCheck('size', min_occurs=0))
+        self.ch.add_child(item)
+
+    def stream(self, text, **kwargs):
+        return check_stream(self.ch, StringIO.StringIO(text), **kwargs)
+
+    def test_valid(self):
+        text = '<feed><item id="1"><name>a</name><size>3</size></item>'\
+            '<item id="2"><name>b</name></item></feed>'
+        self.assertEqual(self.stream(text), [])
+        self.assertTrue(self.ch.validate_stream(StringIO.StringIO(text)))
+
+    def test_same_errors_as_check_node(self):
+        text = '<feed><item id="x"><size>3</size><name>a</name></item>'\
+            '<item><bogus/><name>b</name></item><item id="1" a="b"/></feed>'
+        expected = check_node(self.ch, ET.fromstring(text))
+        found = self.stream(text)
+        self.assertEqual(sorted(str(e) for e in found),
+            sorted(str(e) for e in expected))
+        self.assertEqual(sorted(e.__class__.__name__ for e in found),
+            sorted(e.__class__.__name__ for e in expected))
+
+    def test_mismatched_root(self):
+        errors = self.stream('<item id="1"><name>a</name></item>')
+        self.assertEqual(len(errors), 1)
+        self.assertTrue(isinstance(errors[0], MismatchedTagError))
+
+    def test_max_errors(self):
+        text = '<feed>%s</feed>' % ('<item id="x"/>' * 20)
+        self.assertEqual(len(self.stream(text)), 40)
+        self.assertEqual(len(self.stream(text, max_errors=3)), 3)
+        self.assertRaises(ValueError, self.ch.validate_stream,
+            StringIO.StringIO(text), fail_fast=True)
+
+    def test_file_name(self):
+        handle, path = tempfile.mkstemp(suffix='.xml')
+        try:
+            os.write(handle, '<feed><item id="1"><name>a</name></item></feed>')
+            os.close(handle)
+            self.assertEqual(check_stream(self.ch, path), [])
+        finally:
+            os.remove(path)
+
+    def test_not_a_checker(self):
+        errors = check_stream(None, StringIO.StringIO('<feed/>'))
+        self.assertTrue(isinstance(errors[0], NotACheckerError))
+
+
+class LoggingTC(unittest.TestCase):
+    def setUp(self):
+        self.records = []
+        test = self
+        class Collector(logging.Handler):
+            def emit(self, record):
+                test.records.append(record.getMessage())
+        self.handler = Collector()
+        self.xlogger = logging.getLogger('xcheck')
+        self.xlogger.addHandler(self.handler)
+        self.level = self.xlogger.level
+
+    def tearDown(self):
+        self.xlogger.removeHandler(self.handler)
+        self.xlogger.setLevel(self.level)
+        set_hot_path_logging(None)
+
+    def test_shared_loggers(self):
+        before = len(logging.Logger.manager.loggerDict)
+        checkers = [IntCheck('dynamic%d' % idx) for idx in range(50)]
+        self.assertEqual(len(logging.Logger.manager.loggerDict), before)
+        self.assertEqual(checkers[0].logger.name, 'xcheck.IntCheck')
+        self.assertTrue(checkers[0].logger is checkers[1].logger)
+        self.assertEqual(XCheck('x').logger.name, 'xcheck.XCheck')
+
+    def test_no_formatting_when_disabled(self):
+        calls = []
+        class Value(object):
+            def __float__(self):
+                return 3.0
+            def __str__(self):
+                calls.append(1)
+                return '3'
+        self.xlogger.setLevel(logging.WARNING)
+        IntCheck('n')(Value())
+        self.assertEqual(calls, [])
+        self.assertFalse(instrumentation.debug)
+
+    def test_debug_follows_levels(self):
+        self.xlogger.setLevel(logging.DEBUG)
+        IntCheck('n')('4')
+        self.assertTrue(instrumentation.debug)
+        self.assertTrue(any('check_content' in msg for msg in self.records))
+
+    def test_refresh_once_per_validation(self):
+        calls = []
+        cls = type(instrumentation)
+        refresh = cls.refresh
+        def counting(self):
+            calls.append(1)
+            return refresh(self)
+        cls.refresh = counting
+        try:
+            IntCheck('n')('4')
+            dude(dudeNode)
+            self.assertEqual(len(calls), 2)
+            with xcheck.core.call_context(None):
+                IntCheck('n')('4')
+                dude(dudeNode)
+            self.assertEqual(len(calls), 2)
+        finally:
+            cls.refresh = refresh
+
+    def test_mode(self):
+        self.xlogger.setLevel(logging.DEBUG)
+        set_hot_path_logging(False)
+        IntCheck('n')('4')
+        self.assertFalse(instrumentation.debug)
+        self.assertFalse(any('check_content' in msg for msg in self.records))
+
+
+class ThreadSafetyTC(unittest.TestCase):
+    def setUp(self):
+        n = IntCheck('n')
+        d = DatetimeCheck('d', format='%Y-%m-%d')
+        b = BoolCheck('b')
+        l = ListCheck('l')
+        self.cases = [(n, '12', {'as_string': True}),
+            (n, '13', {'normalize': True}),
+            (d, '2001-02-03', {'as_datetime': True}),
+            (d, '2001-02-04', {'as_date': True}),
+            (d, '2001-02-05', {'as_string': True}),
+            (b, 'yes', {'as_string': True}),
+            (b, 'no', {'normalize': True}),
+            (l, 'a, b', {'as_string': True}),
+            (l, '<l>c,d</l>', {'normalize': True})]
+
+    def test_shared_checkers(self):
+        import sys
+        import threading
+        expected = [(checker(value, **kw), checker(value, **kw).__class__)
+            for checker, value, kw in self.cases]
+        wrong = []
+        def work(offset):
+            for idx in range(500):
+                case = (idx + offset) % len(self.cases)
+                checker, value, kw = self.cases[case]
+                found = checker(value, **kw)
+                if (found, found.__class__) != expected[case]:
+                    wrong.append((case, found))
+
+        interval = sys.getcheckinterval()
+        sys.setcheckinterval(1)
+        try:
+            threads = [threading.Thread(target=work, args=(offset,))
+                for offset in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        finally:
+            sys.setcheckinterval(interval)
+        self.assertEqual(wrong, [])
+
+    def test_call_options_do_not_stick(self):
+        d = DatetimeCheck('d', format='%Y-%m-%d')
+        d('2001-02-03', as_datetime=True)
+        self.assertEqual(d.as_datetime, False)
+        self.assertEqual(d('2001-02-03', as_string=True), '2001-02-03')
+
+    def test_configured_option(self):
+        l = ListCheck('l', as_string=True)
+        self.assertTrue(l.as_string)
+        self.assertEqual(l('a,b', normalize=True), ['a', 'b'])
+        self.assertEqual(l('a,b', as_string=True), 'a, b')
+        self.assertTrue(l.as_string)
+
+    def test_context(self):
+        n = IntCheck('n')
+        self.assertTrue(current_context() is None)
+        with call_context(n, {'as_string': True}) as context:
+            self.assertTrue(current_context() is context)
+            self.assertTrue(n.as_string)
+            n.check_content('4')
+            self.assertEqual(context.values[id(n)], '4')
+        self.assertTrue(current_context() is None)
+        self.assertFalse(n.as_string)
+
+
+class BatchTC(unittest.TestCase):
+    def setUp(self):
+        self.ch = load_checker("""<xcheck name="item">
+            <children>
+                <text name="name" min_length="1" />
+                <int name="size" min_occurs="0" />
+            </children>
+            </xcheck>""")
+        self.items = ['<item><name>a</name></item>',
+            ET.fromstring('<item><name>b</name><size>x</size></item>'),
+            '<item><size>2</size></item>',
+            '<item><name>',
+            ]
+
+    def check_results(self, results):
+        self.assertEqual(len(results), 4)
+        self.assertEqual(results[0], [])
+        self.assertEqual(len(results[1]), 1)
+        self.assertTrue(isinstance(results[2][0], MissingChildError))
+        self.assertEqual(len(results[3]), 1)
+
+    def test_threads(self):
+        self.check_results(self.ch.validate_many(self.items, workers=2,
+            executor='thread'))
+
+    def test_processes(self):
+        self.check_results(self.ch.validate_many(self.items, workers=2))
+
+    def test_as_completed(self):
+        results = check_many(self.ch, self.items, workers=2,
+            executor='thread', ordered=False)
+        self.assertTrue(isinstance(results, list))
+        self.check_results([errors for index, errors in sorted(results)])
+
+    def test_pool_closed(self):
+        import threading
+        before = threading.active_count()
+        check_many(self.ch, self.items, workers=2, executor='thread',
+            ordered=False)
+        self.assertEqual(threading.active_count(), before)
+
+    def test_file_names(self):
+        handle, path = tempfile.mkstemp(suffix='.xml')
+        try:
+            os.write(handle, '<item><name>a</name></item>')
+            os.close(handle)
+            self.assertEqual(self.ch.validate_many([path, path],
+                executor='thread'), [[], []])
+        finally:
+            os.remove(path)
+
+    def test_pickle(self):
+        import pickle
+        copy = pickle.loads(pickle.dumps(self.ch, 2))
+        self.assertEqual(copy.get('size').name, 'size')
+        self.assertTrue(copy.logger is not None)
+
+    def test_bad_executor(self):
+        self.assertRaises(ValueError, self.ch.validate_many, self.items,
+            executor='fiber')
+
+
+class ChildOrderTC(unittest.TestCase):
+    def setUp(self):
+        self.ch = XCheck('a')
+        self.ch.add_child(XCheck('b'), XCheck('c', min_occurs=0),
+            XCheck('d', max_occurs=2))
+
+    def errors(self, text):
+        return [str(e) for e in
+            check_node_ordered_children(self.ch, ET.fromstring(text))]
+
+    def test_cached(self):
+        self.assertTrue(self.ch.child_order() is self.ch.child_order())
+
+    def test_rebuilt_after_change(self):
+        order = self.ch.child_order()
+        self.ch.get('d').max_occurs = 3
+        self.assertFalse(self.ch.child_order() is order)
+        self.assertEqual(self.errors('<a><b/><d/><d/><d/></a>'), [])
+
+    def test_kept_for_new_checkers(self):
+        order = self.ch.child_order()
+        TextCheck('other', min_occurs=0, children=[XCheck('x')])
+        self.ch.get('b').max_occurs = 1
+        self.assertTrue(self.ch.child_order() is order)
+        w = Wrap(self.ch, '<a><b/><d/></a>')
+        IntCheck('more')
+        self.assertTrue(type(Wrap(self.ch, '<a><b/><d/></a>')) is type(w))
+
+    def test_valid(self):
+        self.assertEqual(self.errors('<a><b/><c/><d/><d/></a>'), [])
+        self.assertEqual(self.errors('<a><b/><d/></a>'), [])
+
+    def test_errors(self):
+        self.assertEqual(self.errors('<a><d/><d/><d/></a>'),
+            ['Not enough "b" children in d node',
+             'Too many "d" children in d node'])
+        self.assertEqual(self.errors('<a><c/><b/></a>'),
+            ['Not enough "b" children in c node',
+             'Missing "d" children in a node',
+             'Unexpected child b'])
+        self.assertEqual(self.errors('<a><b/><x/><y/></a>'),
+            ['Missing "d" children in a node',
+             'Unexpected child x', 'Unepected child y'])
+
+    def test_incremental(self):
+        errors = ErrorList()
+        run = self.ch.child_order().start('a', errors)
+        for tag in ['b', 'd']:
+            run.feed(tag)
+        self.assertEqual(errors, [])
+        self.assertEqual(run.finish(), [])
+
+    def test_no_children_expected(self):
+        self.assertEqual(check_node_ordered_children(
+            XCheck('a'), ET.fromstring('<a><b/></a>')), [])
+
+
+class ReportTC(unittest.TestCase):
+    def setUp(self):
+        self.ch = XCheck('feed')
+        item = XCheck('item', max_occurs=10)
+        item.addattribute(IntCheck('id'))
+        item.add_child(IntCheck('qty'))
+        self.ch.add_child(item)
+        self.node = ET.fromstring('<feed><item id="1"><qty>2</qty></item>'
+            '<item id="x"><qty>y</qty></item></feed>')
+
+    def test_same_as_check_node(self):
+        res = check_report(self.ch, self.node)
+        self.assertEqual(res.messages(),
+            [str(e) for e in check_node(self.ch, self.node)])
+        self.assertEqual([e.__class__ for e in res.errors()],
+            [e.__class__ for e in check_node(self.ch, self.node)])
+        self.assertFalse(res.ok)
+        self.assertTrue(check_report(self.ch, self.node[0]).ok is False)
+
+    def test_record_fields(self):
+        res = check_report(self.ch, self.node)
+        att, qty = res
+        self.assertEqual(att.checker.name, 'id')
+        self.assertTrue(att.node is self.node[1])
+        self.assertEqual(att.value, 'x')
+        self.assertEqual(qty.checker.name, 'qty')
+        self.assertEqual(qty.value, 'y')
+        self.assertTrue(issubclass(qty.error_class, ValueError))
+
+    def test_path(self):
+        res = check_report(self.ch, self.node)
+        self.assertEqual([res.path(record) for record in res],
+            ['/feed/item[2]', '/feed/item[2]/qty'])
+
+    def test_max_errors(self):
+        res = check_report(self.ch, self.node, max_errors=1)
+        self.assertEqual(len(res), 1)
+        self.assertEqual(res.counts(), {'ValueError': 1})
+        self.assertTrue(isinstance(res.first(), ValueError))
+
+    def test_messages_are_lazy(self):
+        calls = []
+        class Template(str):
+            def format(self, *args):
+                calls.append(args)
+                return str.format(self, *args)
+        res = ValidationReport()
+        res.add(MissingChildError, Template("Not enough '{0}'"), ('b',))
+        self.assertEqual(calls, [])
+        self.assertEqual(res.messages(), ["Not enough 'b'"])
+        self.assertEqual(len(calls), 1)
+
+    def test_structure_errors(self):
+        node = ET.fromstring('<feed><bad/></feed>')
+        res = check_report(self.ch, node)
+        self.assertEqual(res.counts(),
+            {'MissingChildError': 1, 'UnexpectedChildError': 3,
+             'NotACheckerError': 1})
+        self.assertTrue(all(record.checker is not None for record in res))
+
+    def test_checker_report(self):
+        self.assertTrue(IntCheck('n').report('4').ok)
+        res = IntCheck('n').report('four')
+        self.assertEqual(len(res), 1)
+        self.assertEqual(res[0].value, 'four')
+        self.assertEqual(res.path(res[0]), None)
+
+    def test_plan_report(self):
+        plan = self.ch.compile()
+        self.assertEqual(plan.report(self.node).messages(),
+            check_report(self.ch, self.node).messages())
+        self.assertEqual([r.checker.name for r in plan.report(self.node)],
+            ['id', 'qty'])
+
+
+class LRUCacheTC(unittest.TestCase):
+    def test_evicts_least_recently_used(self):
+        cache = utils.LRUCache(2)
+        cache['a'] = 1
+        cache['b'] = 2
+        self.assertEqual(cache.get('a'), 1)
+        cache['c'] = 3
+        self.assertEqual(len(cache), 2)
+        self.assertFalse('b' in cache)
+        self.assertEqual(cache.get('b', 'missing'), 'missing')
+        self.assertEqual((cache.get('a'), cache.get('c')), (1, 3))
+
+    def test_disabled(self):
+        cache = utils.LRUCache(0)
+        cache['a'] = 1
+        self.assertEqual(len(cache), 0)
+
+    def test_pickle(self):
+        import pickle
+        cache = utils.LRUCache(5)
+        cache['a'] = 1
+        copy = pickle.loads(pickle.dumps(cache))
+        self.assertEqual((copy.maxsize, len(copy)), (5, 0))
+
+
+class GetBoolTC(unittest.TestCase):
+    def test_tokens(self):
+        for item in [True, 'true', 'YES', 'y', 'T', 1, '1']:
+            self.assertTrue(utils.get_bool(item) is True)
+        for item in [False, 'false', 'No', 'n', 'F', 0, '0']:
+            self.assertTrue(utils.get_bool(item) is False)
+
+    def test_bad_values(self):
+        for item in ['maybe', ' yes', '', None, 1.0]:
+            self.assertRaises(ValueError, utils.get_bool, item)
+
+    def test_boolcheck_agrees(self):
+        flag = BoolCheck('flag', none_is_false=False)
+        for token, value in utils.BOOL_TOKENS.items():
+            self.assertEqual(flag(token.upper(), normalize=True), value)
+        self.assertRaises(flag.error, flag, 'maybe')
+
+
+class ContentCacheTC(unittest.TestCase):
+    def setUp(self):
+        set_content_cache(100)
+
+    def tearDown(self):
+        set_content_cache(0)
+
+    def test_off_by_default(self):
+        set_content_cache(0)
+        IntCheck('i')('5')
+        self.assertEqual(content_cache_info(), (0, 0, 0, 0))
+
+    def test_hits_replay_normalized_values(self):
+        number = IntCheck('number')
+        self.assertEqual(number('5', normalize=True), 5)
+        self.assertEqual(number('5', normalize=True), 5)
+        self.assertEqual(number('5', as_string=True, normalize=True), '5')
+        self.assertEqual(content_cache_info()[:2], (1, 2))
+
+    def test_hits_replay_errors(self):
+        number = IntCheck('number', max=3)
+        found = []
+        for idx in range(2):
+            errors = check_node(number, ET.fromstring('<number>5</number>'))
+            self.assertEqual(len(errors), 1)
+            self.assertTrue(isinstance(errors[0], number.error))
+            found.append(errors[0])
+        self.assertEqual(content_cache_info()[:2], (1, 1))
+        # each hit raises a new error
+        self.assertFalse(found[0] is found[1])
+        self.assertEqual(str(found[0]), str(found[1]))
+
+    def test_no_setattr_patching(self):
+        patched = '__setattr__' in XCheck.__dict__
+        set_content_cache(0)
+        self.assertEqual('__setattr__' in XCheck.__dict__, patched)
+
+    def test_shared_by_checkers_with_the_same_settings(self):
+        IntCheck('a', max=3)('2')
+        IntCheck('a', max=3)('2')
+        IntCheck('a', max=2)('2')
+        self.assertEqual(content_cache_info()[:2], (1, 2))
+
+    def test_settings_change(self):
+        word = TextCheck('word', pattern='a')
+        self.assertTrue(word('cat'))
+        word.pattern = 'x'
+        self.assertRaises(word.error, word, 'cat')
+        word.min_length = 5
+        self.assertRaises(word.error, word, 'taxi')
+
+    def test_settings_changed_while_off(self):
+        word = TextCheck('word', pattern='a')
+        self.assertTrue(word('cat'))
+        set_content_cache(0)
+        word.pattern = 'x'
+        set_content_cache(100)
+        self.assertRaises(word.error, word, 'cat')
+
+    def test_pickle(self):
+        import pickle
+        number = IntCheck('number')
+        number('5')
+        self.assertFalse('_memo_key' in pickle.loads(
+            pickle.dumps(number)).__dict__)
+
+    def test_plan(self):
+        plan = name.compile()
+        node = ET.fromstring('<name><first nick="y">Josh</first>'
+            '<last>English</last><code>1</code><code>1</code></name>')
+        self.assertEqual(plan.check(node), [])
+        self.assertEqual(plan.check(node), [])
+        self.assertEqual(content_cache_info()[:2], (6, 4))
+
+    def test_callback_values_are_not_cached(self):
+        values = ['a']
+        choice = SelectionCheck('choice', callback=lambda: values)
+        set_content_cache(100)
+        self.assertTrue(choice('a'))
+        values[:] = ['b']
+        self.assertRaises(choice.error, choice, 'a')
+        self.assertEqual(content_cache_info()[:2], (0, 0))
+
+    def test_lists_are_copied(self):
+        items = ListCheck('items')
+        items('a, b', normalize=True).append('c')
+        self.assertEqual(items('a, b', normalize=True), ['a', 'b'])
+
+    def test_declared_settings(self):
+        class Shout(TextCheck):
+            _settings = TextCheck._settings + ('loud',)
+            loud = False
+            def check_content(self, item):
+                if self.loud and item != item.upper():
+                    raise self.error('too quiet')
+                return TextCheck.check_content(self, item)
+        quiet, loud = Shout('s'), Shout('s')
+        loud.loud = True
+        self.assertTrue(quiet('abc'))
+        self.assertRaises(loud.error, loud, 'abc')
+        # per-call state is not a setting
+        number = IntCheck('number')
+        number('5')
+        number._parse_state = 'anything'
+        self.assertEqual(xcheck.memo.content_cache.key(number),
+            xcheck.memo.content_cache.key(IntCheck('number')))
+
+    def test_keys_are_bounded_and_cleared(self):
+        cache = xcheck.memo.content_cache
+        set_content_cache(2)
+        numbers = [IntCheck('n%d' % idx) for idx in range(5)]
+        for number in numbers:
+            number('1')
+        self.assertEqual(len(cache._keys), 2)
+        cache.clear()
+        self.assertEqual(len(cache._keys), 0)
+        self.assertEqual(numbers[0]('1', normalize=True), 1)
+
 
 if __name__=='__main__':
     streamer = logging.StreamHandler()
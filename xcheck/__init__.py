@@ -17,6 +17,11 @@ from listcheck import SelectionCheck, ListCheck
 from numbercheck import IntCheck, DecimalCheck
 from datetimecheck import DatetimeCheck
 from wrap import Wrap
+from report import ErrorRecord, ValidationReport, check_report
+from plan import ValidationPlan
+from stream import check_stream
+from batch import check_many
+from memo import set_content_cache, content_cache_info
 from loader import load_checker
 
 from infinity import INF, NINF
@@ -0,0 +1,114 @@
+"""batch
+Validates many documents with a pool of worker threads or processes.
+
+check_many(checker, items) returns one list of errors per item. Each item
+can be an Element, an XML-formatted string, the name of an XML file or a
+plain value (checked like calling the checker).
+
+Process workers receive the checker once, when the pool starts, and
+compile it into a ValidationPlan. Elements are sent to them as XML text.
+"""
+__history__ = """
+2026-10-17 -        - Created
+"""
+
+import os
+import multiprocessing
+import multiprocessing.pool
+
+from core import XCheck, ET, ErrorList, NotACheckerError
+from memo import check_content
+
+__all__ = ['check_many', 'EXECUTORS']
+
+EXECUTORS = ('process', 'thread')
+
+# the plan used by a process worker, set by _init_worker
+_worker_plan = None
+
+
+def _init_worker(checker):
+    global _worker_plan
+    _worker_plan = checker.compile()
+
+
+def _check_item(plan, item, max_errors):
+    """returns the errors for one item"""
+    if ET.iselement(item):
+        return plan.check(item, max_errors)
+    if isinstance(item, basestring):
+        text = item.lstrip()
+        try:
+            if text.startswith('<'):
+                return plan.check(ET.fromstring(text), max_errors)
+            if os.path.isfile(item):
+                return plan.check(ET.parse(item).getroot(), max_errors)
+        except Exception as E:
+            # a parse error is the only error for the document
+            return [E]
+    errors = ErrorList(max_errors)
+    try:
+        check_content(plan.checker, item)
+    except Exception as E:
+        errors.append(E)
+    return errors
+
+
+def _process_task(task):
+    index, item, max_errors = task
+    return index, list(_check_item(_worker_plan, item, max_errors))
+
+
+def check_many(checker, items, workers=None, executor='process',
+        ordered=True, max_errors=None, chunksize=None):
+    """check_many(checker, items[, workers, executor, ordered, max_errors,
+        chunksize])
+
+    Validates every item with a pool of workers.
+
+    :param workers: the size of the pool. Defaults to the number of CPUs.
+    :param executor: 'process' or 'thread'
+    :param ordered: if True, returns a list of error lists in input order.
+        Otherwise returns a list of (index, errors) pairs in the order the
+        items finished.
+
+    The pool is closed before check_many returns.
+    :param max_errors: stop checking an item after this many errors
+    :param chunksize: items sent to a worker at a time
+    """
+    if not isinstance(checker, XCheck):
+        raise NotACheckerError("{0} is not an XCheck instance".format(
+            checker))
+    if executor not in EXECUTORS:
+        raise ValueError("executor must be one of {0}".format(
+            ", ".join(EXECUTORS)))
+    workers = workers or multiprocessing.cpu_count()
+    if chunksize is None:
+        if hasattr(items, '__len__'):
+            chunksize = max(1, len(items) // (workers * 4))
+        else:
+            chunksize = 32
+
+    if executor == 'process':
+        pool = multiprocessing.Pool(workers, _init_worker, (checker,))
+        # elements are sent as text, which pickles much faster
+        tasks = ((index, ET.tostring(item) if ET.iselement(item) else item,
+            max_errors) for index, item in enumerate(items))
+        task = _process_task
+    else:
+        pool = multiprocessing.pool.ThreadPool(workers)
+        plan = checker.compile()
+        tasks = ((index, item, max_errors)
+            for index, item in enumerate(items))
+        def task(task):
+            index, item, limit = task
+            return index, list(_check_item(plan, item, limit))
+
+    try:
+        if ordered:
+            return [errors for index, errors in
+                pool.imap(task, tasks, chunksize)]
+        return list(pool.imap_unordered(task, tasks, chunksize))
+    finally:
+        pool.close()
+        pool.join()
@@ -1,4 +1,5 @@
-from core import XCheck, ET
+from core import XCheck, ET, CallOption
+from utils import BOOL_TOKENS
 
 class BoolCheck(XCheck):
     """BoolCheck(name, **kwargs)
@@ -14,6 +15,10 @@ class BoolCheck(XCheck):
 
     Returns a boolean if normalized
     """
+    as_string = CallOption('as_string')
+    memoize = True
+    _settings = XCheck._settings + ('none_is_false', 'as_string')
+
     def __init__(self, name, **kwargs):
         self.none_is_false = kwargs.pop('none_is_false', True)
         XCheck.__init__(self, name, **kwargs)
@@ -22,43 +27,40 @@ class BoolCheck(XCheck):
 
 
     def check_content(self, item):
-        ok = None
-
-        if str(item).lower() in ['true', 'yes', '1', 't', 'y']:
-            ok = True
-            self.normalize_content(True)
-        if str(item).lower() in ['false', 'no', '0', 'f', 'n']:
-            ok = True
-            self.normalize_content(False)
-
-        if item is None or str(item).lower().strip() == 'none':
-            if self.none_is_false:
-                ok = True
-                self.normalize_content(False)
+        text = str(item).lower()
+        value = BOOL_TOKENS.get(text)
+
+        if value is None:
+            if item is None or text.strip() == 'none':
+                if not self.none_is_false:
+                    raise self.error, "BoolCheck cannot accept None"
+                value = False
             else:
-                ok = False
-                raise self.error, "BoolCheck cannot accept None"
-
-        if ok is None:
+                raise self.error, "Boolean checker cannot check %s" % item
 
-            ok = False
-            raise self.error, "Boolean checker cannot check %s" % item
-        return ok
+        if self.as_string:
+            self._normalized_value = str(value)
+        else:
+            self._normalized_value = value
+        return True
 
 
     def normalize_content(self, item):
-        if str(item).lower() in ['true', 'yes', '1', 't', 'y']:
-            self._normalized_value = True
-        if str(item).lower() in ['false', 'no', '0', 'f', 'n']:
-            self._normalized_value = False
+        value = BOOL_TOKENS.get(str(item).lower())
+        if value is not None:
+            self._normalized_value = value
         if self.as_string:
             self._normalized_value = str(self._normalized_value)
 
     def __call__(self, item, **kwargs):
-        self.as_string = kwargs.pop('as_string', False)
-        if self.as_string:
+        options, kwargs = self._call_options(kwargs)
+        return self._call(item, options, **kwargs)
+
+    def _call_options(self, kwargs):
+        as_string = kwargs.pop('as_string', False)
+        if as_string:
             kwargs['normalize'] = True
-        return XCheck.__call__(self, item, **kwargs)
+        return {'as_string': as_string}, kwargs
 
     def dummy_value(self):
         return 'False'
@@ -18,9 +18,15 @@ __history__ = """
 2014-03-17 - Rev 31 - Added XCheck.get_all_items, updated xpath_to, get
 2014-03-28 - Rev 33 - Added check_ functions to replace the massively confusing
                       XCheck.__call__ method
+2026-10-17 -        - Added the schema path index (XCheck.path_info) behind
+                      get, dotted_path_to, xpath_to and is_att
 """
+import bisect
 import logging
+import threading
+import contextlib
 import collections
+import weakref
 
 if hasattr(collections, "OrderedDict"):
     DICT_CLASS = collections.OrderedDict
@@ -67,6 +73,141 @@ class NotAnElementError(XCheckError): pass
 INIT = 2
 logging.addLevelName(INIT, "INIT")
 
+# All checkers log to the xcheck hierarchy, one logger per checker class
+# (xcheck.IntCheck, xcheck.ListCheck, ...)
+logger = logging.getLogger('xcheck')
+_class_loggers = {}
+
+def class_logger(cls):
+    """returns the logger for a checker class"""
+    try:
+        return _class_loggers[cls]
+    except KeyError:
+        found = _class_loggers[cls] = logging.getLogger(
+            'xcheck.%s' % cls.__name__)
+        return found
+
+class _ClassLogger(object):
+    """The logger attribute of checkers. It is shared by every checker of
+    the same class"""
+    def __get__(self, checker, cls):
+        return class_logger(cls)
+
+class Instrumentation(object):
+    """Instrumentation()
+    Tells the validation hot path whether to log.
+
+    The debug calls made for every value are guarded by
+    ``if instrumentation.debug``. The flag is worked out from the logger
+    levels once at the start of each validation, so a disabled logger costs
+    one attribute test per value.
+    """
+    __slots__ = ('debug', 'mode')
+
+    def __init__(self):
+        self.debug = False
+        self.mode = None
+
+    def refresh(self):
+        """sets debug from the mode, or from the logger levels"""
+        if self.mode is not None:
+            self.debug = self.mode
+        else:
+            self.debug = any(each.isEnabledFor(logging.DEBUG)
+                for each in [logger] + _class_loggers.values())
+        return self.debug
+
+instrumentation = Instrumentation()
+
+def refresh_instrumentation():
+    """refreshes the instrumentation flag at the start of a validation.
+    Checks made while a call is running keep the flag of that call"""
+    if not getattr(_local, 'stack', None):
+        instrumentation.refresh()
+
+def set_hot_path_logging(mode=None):
+    """set_hot_path_logging([mode])
+    True always logs values while validating, False never does.
+    None (the default) follows the levels of the xcheck loggers.
+    """
+    instrumentation.mode = mode
+    instrumentation.refresh()
+
+# One entry of the schema path index. See XCheck.path_info
+PathInfo = collections.namedtuple('PathInfo',
+    'checker dotted_path xpath is_att parent')
+
+
+class CallContext(object):
+    """CallContext(checker, options)
+    The state of one call to a checker: the options given to the call and
+    the values normalized while it runs.
+
+    Each thread has its own stack of contexts, so one checker tree can be
+    called from many threads at once.
+    """
+    __slots__ = ('checker', 'options', 'values')
+
+    def __init__(self, checker, options):
+        self.checker = checker
+        self.options = options
+        self.values = {}
+
+_local = threading.local()
+
+def _context_stack():
+    """returns the CallContext stack of this thread"""
+    stack = getattr(_local, 'stack', None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+def current_context():
+    """returns the CallContext of the innermost call in this thread,
+    or None outside of a call"""
+    stack = getattr(_local, 'stack', None)
+    if stack:
+        return stack[-1]
+    return None
+
+@contextlib.contextmanager
+def call_context(checker, options=None):
+    """pushes a CallContext for the duration of a with block"""
+    stack = _context_stack()
+    context = CallContext(checker, options or {})
+    stack.append(context)
+    try:
+        yield context
+    finally:
+        stack.pop()
+
+class CallOption(object):
+    """CallOption(name, default)
+    A checker setting that a call can override, like as_string.
+
+    Inside a call to the checker the value given to the call is used.
+    Otherwise the value set on the checker is used.
+    """
+    def __init__(self, name, default=False):
+        self.name = name
+        self.default = default
+        self._key = '_%s_setting' % name
+
+    def __get__(self, checker, cls):
+        if checker is None:
+            return self
+        context = current_context()
+        if (context is not None and context.checker is checker
+                and self.name in context.options):
+            return context.options[self.name]
+        return self.setting(checker)
+
+    def setting(self, checker):
+        """returns the value set on the checker, ignoring the current call"""
+        return checker.__dict__.get(self._key, self.default)
+
+    def __set__(self, checker, value):
+        checker.__dict__[self._key] = value
 
 from utils import insert_node, get_elem
 class XCheck(object):
@@ -116,10 +257,31 @@ class XCheck(object):
         sortDone(parent, childName, sortkey, reverse=False)
             -- sorts children of a node
     """
+    logger = _ClassLogger()
+
+    # True if check_content depends only on the settings and the value, so
+    # its results can be kept in the content cache. See memo.py
+    memoize = False
+    # the attributes check_content depends on. Subclasses add their own
+    _settings = ('name', 'error')
+
+    def __setattr__(self, name, value):
+        object.__setattr__(self, name, value)
+        if name[0] != '_':
+            # a setting changed. The content cache keys checkers by their
+            # settings and looks them up again when this changes
+            self.__dict__['_settings_version'] = \
+                self.__dict__.get('_settings_version', 0) + 1
+
     def __init__(self, name, **kwargs):
 
+        self._child_order = None
+        # a new checker is in no tree yet, so setting it up does not
+        # change the schema generation
+        self._schema_ready = False
+        self._generation = 0
+        self._parents = []
         self.name_ = name    # required (cannot be changed)
-        self.logger = logging.getLogger("%sCheck" % name)
         self.logger.log(INIT, "Creating %sCheck", name)
         self.min_occurs = int(kwargs.pop('min_occurs',1))  # number of times the element
         self.max_occurs = int(kwargs.pop('max_occurs',1)) # can appear in the parent (if any)
@@ -167,15 +329,175 @@ class XCheck(object):
         self._all_paths = None
         self._normalized_value = None
 
+        # schema path index, rebuilt when any checker changes structure
+        self._index = {}
+        self._index_generation = None
+        self._token_set = frozenset()
+        self._tagname_set = frozenset()
+        self._schema_ready = True
+
+    def __getstate__(self):
+        # content cache keys only mean something in this process, and the
+        # generated Wrap classes cannot be pickled
+        state = self.__dict__.copy()
+        state.pop('_memo_key', None)
+        state.pop('_wrap_classes', None)
+        # parent links are weak references. __setstate__ makes them again
+        state.pop('_parents', None)
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__dict__.setdefault('_parents', [])
+        for child in self.children + self.attributes.values():
+            child._link_parent(self)
+
+    def _link_parent(self, parent):
+        """records a checker this one was added to"""
+        # when unpickling, the parent can be set up before this checker
+        self.__dict__.setdefault('_parents', []).append(weakref.ref(parent))
+
+    # _generation is bumped by _add_child, _addattribute and changed
+    # occurrence limits once a checker is set up, and the change is passed
+    # up the parent links. A checker's caches cover its own subtree, so
+    # they only go stale when its own generation moves.
+
+    def _schema_changed(self):
+        """bumps the schema generation of the checker and every checker
+        above it, unless the checker is still being set up by __init__"""
+        if not self.__dict__.get('_schema_ready'):
+            return
+        todo = [self]
+        seen = set()
+        while todo:
+            checker = todo.pop()
+            if id(checker) in seen:
+                continue
+            seen.add(id(checker))
+            checker._generation += 1
+            for ref in checker._parents:
+                parent = ref()
+                if parent is not None:
+                    todo.append(parent)
+
+    def _check_generation(self):
+        """clears the cached paths and index if the schema changed"""
+        if self._index_generation != self._generation:
+            self._index = {}
+            self._all_paths = None
+            self._token_set = frozenset(self.tokens())
+            self._tagname_set = frozenset(self.tagnames())
+            self._index_generation = self._generation
+
+    # occurrence limits are part of the schema, so changing them
+    # invalidates the cached ChildOrder automatons
+    @property
+    def min_occurs(self):
+        """the minimum number of times the element must appear"""
+        return self._min_occurs
+
+    @min_occurs.setter
+    def min_occurs(self, value):
+        if value == self.__dict__.get('_min_occurs'):
+            return
+        self._min_occurs = value
+        self._schema_changed()
+
+    @property
+    def max_occurs(self):
+        """the maximum number of times the element can appear"""
+        return self._max_occurs
+
+    @max_occurs.setter
+    def max_occurs(self, value):
+        if value == self.__dict__.get('_max_occurs'):
+            return
+        self._max_occurs = value
+        self._schema_changed()
+
+    def child_order(self):
+        """child_order() -> ChildOrder
+
+        Returns the automaton that checks the order of the children.
+        It is cached until the schema changes.
+        """
+        cached = self._child_order
+        if cached is None or cached[0] != self._generation:
+            order = ChildOrder(self.name,
+                [(child.name, child.min_occurs, child.max_occurs)
+                    for child in self.children], self)
+            cached = self._child_order = (self._generation, order)
+        return cached[1]
+
     # DEV
     def is_att(self, tag):
         """returns true if the given tag is an attribute"""
         # Issue 11 fix
-        return ('@' in self.xpath_to(tag))
+        return self.path_info(tag).is_att
         # end issue 11 fix
 
     def _is_att(self, tag):
-        return tag in self.tokens() and tag not in self.tagnames()
+        self._check_generation()
+        return tag in self._token_set and tag not in self._tagname_set
+
+    def path_info(self, name):
+        """path_info(name) -> PathInfo
+
+        Returns a PathInfo tuple of (checker, dotted_path, xpath, is_att,
+        parent) for the name. Names are resolved the same way as get and
+        xpath_to, including dotted names. Unknown names give a PathInfo
+        of Nones.
+
+        Results are kept in an index that is rebuilt after add_child or
+        addattribute is called on the checker or any checker below it.
+        """
+        self._check_generation()
+        try:
+            return self._index[name]
+        except KeyError:
+            info = self._index[name] = self._scan_path(name)
+            return info
+
+    def _scan_path(self, name):
+        """resolves a name with a linear search of get_all_paths.
+        path_info stores the result, so this runs once per name"""
+        self.logger.debug('Indexing %s', name)
+        paths = self.get_all_paths()
+        possibilities = [path for path in paths if path.endswith(name)]
+        if len(possibilities) > 1:
+            possibilities = [path for path in possibilities
+                if path.endswith('.%s' % name)]
+        self.logger.debug(' found %d possibilities', len(possibilities))
+
+        if not possibilities:
+            return PathInfo(None, None, None, False, None)
+
+        dotted_path = possibilities[0]
+        tokens = dotted_path.split('.')
+        if self._is_att(tokens[-1]):
+            xpath = '/'.join(tokens[:-1]) + "[@%s]" % tokens[-1]
+        else:
+            xpath = '/'.join(tokens)
+        xpath = xpath.replace(self.name, '.')
+
+        checker, parent = None, None
+        if name == self.name:
+            checker = self
+        elif name in self.attributes:
+            checker, parent = self.attributes[name], self
+        elif len(possibilities) == 1:
+            this = self
+            for child_to_find in tokens[1:]:
+                if child_to_find in this.attributes:
+                    checker, parent = this.attributes[child_to_find], this
+                    break
+                for child in this.children:
+                    if child.name == child_to_find:
+                        parent, this = this, child
+            else:
+                checker = this
+
+        return PathInfo(checker, dotted_path, xpath, '@' in xpath, parent)
 
     #0.6.5 cut to_dict and from_dict to avoid recursive imports
     # new 0.5.0
@@ -276,39 +598,7 @@ class XCheck(object):
             return self
         if name in self.attributes:
             return self.attributes[name]
-
-        self.logger.debug('Getting %s', name)
-        xpath = self.xpath_to(name)
-        self.logger.debug(' xpath: %s', xpath)
-        if xpath is None:
-            self.logger.debug(' no xpath - returning None')
-            return None
-        paths = self.get_all_paths()
-        def is_in(path):
-            return path.endswith(name)
-        possibilities = filter(is_in, paths)
-        self.logger.debug(' found %d possibilites', len(possibilities))
-##        print "getting", name, "from", self
-        if len(possibilities) > 1:
-            possibilities = filter(lambda x: x.endswith('.%s' % name), possibilities)
-
-        if len(possibilities) == 1:
-            self.logger.debug(' which is %s', possibilities[0])
-            tokens = possibilities[0].split('.')[1:]
-            this = self
-            while tokens:
-                child_to_find = tokens.pop(0)
-                self.logger.debug(' looking for %s', child_to_find)
-                if child_to_find in this.attributes:
-                    return this.attributes[child_to_find]
-                for child in this.children:
-                    if child.name == child_to_find:
-                        this = child
-
-            return this
-
-        else:
-            return None
+        return self.path_info(name).checker
 
     def dict_key(self, name):
         """dict_key(name)
@@ -351,35 +641,17 @@ class XCheck(object):
         return res
 
     def dotted_path_to(self, tag):
-        paths = self.get_all_paths()
-
-        def is_in(path):
-            return path.endswith(tag)
-
-        possibilities = filter(is_in, paths)
-        self.logger.debug('xpath_to possibilities: %s', possibilities)
-
-        if len(possibilities) > 1:
-            possibilities = filter(lambda x: x.endswith('.%s' % tag), possibilities)
-            self.logger.debug('cutting possibilities down to: %s', possibilities)
-
-        if possibilities:
-            return possibilities[0]
+        """dotted_path_to(tag)
+        Returns the dotted path to the tag, starting with the checker name
+        """
+        return self.path_info(tag).dotted_path
 
     # attempted on 3-18-2014
     def xpath_to(self, tag):
-
-        dotted_path = self.dotted_path_to(tag)
-
-        if dotted_path:
-            tokens = dotted_path.split('.')
-            if self._is_att(tokens[-1]):
-                res = '/'.join(tokens[:-1]) + "[@%s]" % tokens[-1]
-            else:
-                res = '/'.join(tokens)
-
-            res = res.replace(self.name, '.')
-            return res
+        """xpath_to(tag)
+        Returns an xpath string to the tag, relative to the checker
+        """
+        return self.path_info(tag).xpath
 
     def _add_child(self, child):
         """adds a child checker to the expected children list"""
@@ -395,6 +667,8 @@ class XCheck(object):
                 "Cannot add %s as child. Exists as attribute" % child.name)
 
         self.children.append(child)
+        child._link_parent(self)
+        self._schema_changed()
         self.logger.log(INIT, "Adding child %s", child.name)
 
     def add_child(self, *children):
@@ -422,6 +696,8 @@ class XCheck(object):
         if self.has_child(att.name):
             raise DuplicateTagError("Child %s already exists" % att.name)
         self.attributes[att.name] = att
+        att._link_parent(self)
+        self._schema_changed()
         self.logger.log(INIT,"Setting attribute %s", att.name)
 
     def addattribute(self, *atts):
@@ -447,16 +723,35 @@ class XCheck(object):
         Return True if all is good, raise an error otherwise
         """
         #
-        self.logger.debug('checking content %s', item)
+        if instrumentation.debug:
+            self.logger.debug('checking content %s', item)
         self.normalize_content(item)
         return True
 
+    # the normalized value belongs to the current call, so threads sharing
+    # a checker do not see each other's values
+    @property
+    def _normalized_value(self):
+        context = current_context()
+        if context is not None and id(self) in context.values:
+            return context.values[id(self)]
+        return self.__dict__['_normalized_setting']
+
+    @_normalized_value.setter
+    def _normalized_value(self, value):
+        context = current_context()
+        if context is not None:
+            context.values[id(self)] = value
+        else:
+            self.__dict__['_normalized_setting'] = value
+
     def normalize_content(self, item):
         """normalize_content(item)
         This is the method used to normalize the return value.
         normalization is optional
         """
-        self.logger.debug('setting normalized_value')
+        if instrumentation.debug:
+            self.logger.debug('setting normalized_value')
         self._normalized_value = item
 
 
@@ -468,46 +763,82 @@ class XCheck(object):
 
         :param: as_string -- returns a string representation
         """
-        self.normalize_content(item)
+        with call_context(self):
+            self.normalize_content(item)
+            value = self._normalized_value
         if as_string:
             self.logger.debug('... converting normalized value to string')
-            return str(self._normalized_value)
+            return str(value)
 
-        return self._normalized_value
+        return value
 
 
     def __call__(self, arg, check_children=None, normalize=False,
-            as_string=False):
+            as_string=False, fail_fast=False, max_errors=None):
+        """Validates the argument. Raises the first error found.
+
+        fail_fast stops checking at the first error. max_errors stops
+        checking once that many errors are found.
+        """
+        return self._call(arg, {}, check_children, normalize, as_string,
+            fail_fast, max_errors)
+
+    def _call_options(self, kwargs):
+        """_call_options(kwargs) -> (options, kwargs)
+        Returns the CallOption values a call with kwargs uses, and the
+        keywords left for _call. Subclasses with call options override it.
+        """
+        return {}, kwargs
 
+    def _call(self, arg, options, check_children=None, normalize=False,
+            as_string=False, fail_fast=False, max_errors=None):
+        """the body of __call__. options are the CallOption values for this
+        call. Subclasses with their own call options use this"""
         check_children = check_children or False
-        res = []
-        if ET.iselement(arg):
-            res.extend(check_node(self, arg))
-        else:
+        if fail_fast:
+            max_errors = 1
+        elif max_errors is not None and max_errors < 1:
+            raise ValueError("max_errors must be at least 1")
+
+        if not ET.iselement(arg):
+            # a string without a tag cannot be parsed as an element
+            if not isinstance(arg, basestring) or '<' not in arg:
+                return self._call_value(arg, options, normalize)
             try:
-                new_arg = get_elem(arg)
-                res.extend(check_node(self, new_arg))
+                arg = get_elem(arg)
             except ValueError:
-                # no element, so try to check the content
-                try:
-                    self.check_content(arg)
-                except Exception as E:
-                    res.append(E)
-
-        if res:
-            self.logger.debug('found %d errors', len(res))
-            for e in res:
-                self.logger.debug(' %s: %s', e.__class__.__name__, e.message)
-            raise res[0]
-
-        if normalize:
-            if not hasattr(self, '_normalized_value'):
-                raise self.error("%s has no normalized value" % self.name)
+                return self._call_value(arg, options, normalize)
+
+        refresh_instrumentation()
+        with call_context(self, options):
+            # only the first error is raised, so only its message is built
+            res = check_report(self, arg, max_errors)
+            if res:
+                if instrumentation.debug:
+                    self.logger.debug('found %d errors', len(res))
+                    for record in res:
+                        self.logger.debug(' %s: %s',
+                            record.error_class.__name__, record.message)
+                raise res.first()
+
+            if normalize:
+                return self._normalized_value
             else:
+                return True
+
+    def _call_value(self, arg, options, normalize):
+        """checks a value that is not an element for _call. A value has
+        one error at most, so the error is raised without a report"""
+        refresh_instrumentation()
+        stack = _context_stack()
+        stack.append(CallContext(self, options))
+        try:
+            _check_content(self, arg)
+            if normalize:
                 return self._normalized_value
-        else:
             return True
-
+        finally:
+            stack.pop()
 
 
 
@@ -854,8 +1185,68 @@ class XCheck(object):
         """
         raise NotImplementedError
 
+    def validate_stream(self, source, fail_fast=False, max_errors=None):
+        """validate_stream(source[, fail_fast, max_errors]) -> True
+
+        Validates a document from a file name or file object without
+        loading all of it. Raises the first error found.
+        See check_stream.
+        """
+        if fail_fast:
+            max_errors = 1
+        res = _check_stream(self, source, ValidationReport(max_errors))
+        if res:
+            raise res.first()
+        return True
+
+    def report(self, arg, max_errors=None):
+        """report(arg[, max_errors]) -> ValidationReport
+
+        Validates an element, an XML-formatted string or a value, and
+        returns a ValidationReport. Messages in the report are formatted
+        only when they are used.
+        """
+        if ET.iselement(arg):
+            return check_report(self, arg, max_errors)
+        try:
+            node = get_elem(arg)
+        except ValueError:
+            # no element, so try to check the content
+            refresh_instrumentation()
+            res = ValidationReport(max_errors)
+            try:
+                _check_content(self, arg)
+            except Exception as E:
+                res.add_exception(E, self, None, arg)
+            return res
+        return check_report(self, node, max_errors)
+
+    def validate_many(self, items, workers=None, executor='process',
+            ordered=True, max_errors=None, chunksize=None):
+        """validate_many(items[, workers, executor, ordered, max_errors,
+            chunksize])
+
+        Validates Elements, XML strings, XML file names or values with a
+        pool of worker processes or threads. Returns a list of errors for
+        each item, in input order. See check_many.
+        """
+        return check_many(self, items, workers, executor, ordered,
+            max_errors, chunksize)
+
+    def compile(self):
+        """compile() -> ValidationPlan
+
+        Returns a read-only ValidationPlan for the checker tree. Checking
+        a node with the plan gives the same errors as check_node, without
+        walking the checker tree again for every element.
+
+        The plan is a snapshot. Compile again after changing the checker.
+        """
+        return ValidationPlan(self)
+
     # cribbed from https://stackoverflow.com/questions/5671486
     def get_all_paths(self, force=False):
+        self._check_generation()
         if not force and self._all_paths:
             return self._all_paths
 
@@ -892,200 +1283,384 @@ from dictwrap import *
 
 from datetimecheck import DatetimeCheck
 
+_START, _COUNTING, _REJECTING, _ACCEPTING = range(4)
+
+class ChildOrder(object):
+    """ChildOrder(checker_name, expected)
+    A finite automaton for the ordered children of a checker.
+
+    :param expected: (name, min_occurs, max_occurs) tuples in schema order
+
+    The automaton has one state per expected child and counts how many
+    times that child repeats. It reads the child tags once, left to right,
+    and never moves back. Use XCheck.child_order() to get the cached
+    automaton for a checker.
+    """
+    def __init__(self, checker_name, expected, checker=None):
+        self.checker_name = checker_name
+        self.checker = checker
+        self.expected = tuple(expected)
+        self.child_names = frozenset(spec[0] for spec in self.expected)
+        self._position = dict((spec[0], idx)
+            for idx, spec in enumerate(self.expected))
+        self._required = [idx for idx, spec in enumerate(self.expected)
+            if spec[1] > 0]
+
+    def start(self, node_tag, error_list, node=None):
+        """returns a run that reads child tags one at a time"""
+        return ChildOrderRun(self, node_tag, error_list, node)
+
+    def check(self, node, error_list):
+        """reads the tags of the node's children. Adds errors to error_list"""
+        run = ChildOrderRun(self, node.tag, error_list, node)
+        feed = run.feed
+        for child in node:
+            if error_list.full:
+                return error_list
+            feed(child.tag)
+        return run.finish()
+
+    def _required_between(self, low, high):
+        """indexes of the required children after low and before high"""
+        required = self._required
+        return required[bisect.bisect_right(required, low):
+            bisect.bisect_left(required, high)]
+
+class ChildOrderRun(object):
+    """One pass of a ChildOrder automaton over the children of a node.
+    Call feed with each child tag, then finish."""
+    __slots__ = ('order', 'node_tag', 'error_list', 'state', 'index',
+        'count', 'round_tag', 'node')
+
+    def __init__(self, order, node_tag, error_list, node=None):
+        self.order = order
+        self.node_tag = node_tag
+        self.node = node
+        self.error_list = error_list
+        self.state = _START if order.expected else _ACCEPTING
+        self.index = 0
+        self.count = 0
+        self.round_tag = None
+
+    def _add(self, error_class, template, args):
+        self.error_list.add(error_class, template, args, self.order.checker,
+            self.node)
+
+    def feed(self, tag):
+        """reads the next child tag"""
+        state = self.state
+        if state == _COUNTING:
+            if tag == self.order.expected[self.index][0]:
+                self.count += 1
+            else:
+                self._end_count()
+                self._skip_to(tag)
+        elif state == _START:
+            self.round_tag = tag
+            if tag not in self.order.child_names:
+                self._add(UnexpectedChildError,
+                    'Unexpected "{0}" child found in "{1}" node',
+                    (tag, self.order.checker_name))
+            if tag == self.order.expected[0][0]:
+                self.count = 1
+                self.state = _COUNTING
+            else:
+                self._end_count()
+                self._skip_to(tag)
+        elif state == _REJECTING:
+            self._add(UnexpectedChildError, "Unepected child {0}", (tag,))
+
+    def _end_count(self):
+        """checks the count of the current expected child"""
+        name, min_occurs, max_occurs = self.order.expected[self.index]
+        if self.count < min_occurs:
+            self._add(MissingChildError,
+                'Not enough "{0}" children in {1} node',
+                (name, self.round_tag))
+        if self.count > max_occurs:
+            self._add(UnexpectedChildError,
+                'Too many "{0}" children in {1} node',
+                (name, self.round_tag))
+
+    def _skip_to(self, tag):
+        """moves forward to the expected child matching tag, reporting the
+        required children skipped on the way"""
+        expected = self.order.expected
+        target = self.order._position.get(tag)
+        if target is None or target <= self.index:
+            stop = len(expected)
+        else:
+            stop = target
+        for idx in self.order._required_between(self.index, stop):
+            self._add(MissingChildError, 'Missing "{0}" children in {1} node',
+                (expected[idx][0], self.node_tag))
+
+        self.index = stop
+        if stop == len(expected):
+            self.state = _REJECTING
+            self._add(UnexpectedChildError, "Unexpected child {0}", (tag,))
+        else:
+            self.count = 1
+            self.round_tag = tag
+            self.state = _COUNTING
+
+    def finish(self):
+        """reports the required children that never appeared.
+        Returns the error list"""
+        state = self.state
+        if state == _START:
+            remaining = self.order._required
+        elif state == _COUNTING:
+            self._end_count()
+            remaining = self.order._required_between(self.index,
+                len(self.order.expected))
+        else:
+            remaining = []
+        for idx in remaining:
+            self._add(MissingChildError, 'Missing "{0}" child in "{1}" node',
+                (self.order.expected[idx][0], self.node_tag))
+        return self.error_list
+
+class ErrorList(list):
+    """ErrorList([max_errors])
+    A list of errors that ignores new errors once it holds max_errors.
+    The check_ functions stop working as soon as the list is full.
+    """
+    def __init__(self, max_errors=None):
+        list.__init__(self)
+        if max_errors is not None and max_errors < 1:
+            raise ValueError("max_errors must be at least 1")
+        self.max_errors = max_errors
+
+    @property
+    def full(self):
+        """returns True if no more errors will be accepted"""
+        return self.max_errors is not None and len(self) >= self.max_errors
+
+    def append(self, error):
+        if not self.full:
+            list.append(self, error)
+
+    def extend(self, errors):
+        for error in errors:
+            self.append(error)
+
+    def add(self, error_class, template, args, checker=None, node=None,
+            value=None):
+        """adds error_class(template.format(*args)).
+        The checker, node and value are used by ValidationReport"""
+        if self.max_errors is None or len(self) < self.max_errors:
+            list.append(self, error_class(template.format(*args)))
+
+    def add_exception(self, error, checker=None, node=None, value=None):
+        """adds an error raised by a checker"""
+        self.append(error)
+
 def match_checker_to_node(func):
     """Ensures a check_ function has a checker that can check the node"""
-    def newfunc(checker, node):
+    def newfunc(checker, node, *args, **kwargs):
         if checker.name != node.tag:
             return  [ MismatchedTagError(
                     '{0} checker given {1} node'.format(
                         checker.name, node.tag))]
         else:
-            return func(checker, node,)
+            return func(checker, node, *args, **kwargs)
     return newfunc
 
 def validate_inputs(func):
     """Ensures a check_x function has a checker and an Element"""
-    def newfunc(checker, node):
+    def newfunc(checker, node, *args, **kwargs):
+        refresh_instrumentation()
         if not isinstance(checker, XCheck):
             return [NotACheckerError("{0} is not an XCheck instance".format(checker))]
         if not ET.iselement(node):
             return [NotAnElementError("{0} is not an Element".format(node))]
-        return func(checker, node)
+        return func(checker, node, *args, **kwargs)
     return newfunc
 
 @validate_inputs
 @match_checker_to_node
-def check_attributes(checker, node,):
+def check_attributes(checker, node, max_errors=None):
     """Checks the attributes are all right"""
-    error_list = []
+    return _check_attributes(checker, node, ErrorList(max_errors))
+
+def _check_attributes(checker, node, error_list):
+    """the body of check_attributes. Adds errors to error_list"""
     node_atts = list(node.attrib)
 ##    print node_atts
     for att in checker.attributes:
+        if error_list.full:
+            return error_list
         node_att = node.get(att)
-        checker.logger.debug('Checking attribute %s with value %s', att, node_att)
+        if instrumentation.debug:
+            checker.logger.debug('Checking attribute %s with value %s',
+                att, node_att)
         att_check = checker.get(att)
 
 
         if att_check.required and node_att is None:
-            error_list.append(MissingAttributeError(
-                "{0} missing required '{1}' attribute".format(
-                    checker.name, att)))
+            error_list.add(MissingAttributeError,
+                "{0} missing required '{1}' attribute",
+                (checker.name, att), att_check, node)
         elif node_att is None:
             continue
         else:
             try:
-                att_check.check_content(node_att)
+                _check_content(att_check, node_att)
             except Exception as E:
-                error_list.append(E)
+                error_list.add_exception(E, att_check, node, node_att)
         if att in node_atts:
             node_atts.remove(att)
 
 
     for na in node_atts:
-        error_list.append(UnknownXMLAttributeError(
-            "'{0}' attribute found in {1} node".format(
-                na, node.tag)))
+        error_list.add(UnknownXMLAttributeError,
+            "'{0}' attribute found in {1} node",
+            (na, node.tag), checker, node, node.get(na))
 
     return error_list
 
 @validate_inputs
 @match_checker_to_node
-def check_node_contents(checker, node):
+def check_node_contents(checker, node, max_errors=None):
     """checks the content of a node"""
-    error_list = []
+    return _check_node_contents(checker, node, ErrorList(max_errors))
+
+def _check_node_contents(checker, node, error_list):
+    """the body of check_node_contents. Adds errors to error_list"""
     try:
-        checker.check_content(node.text) #calling checker(node) checks attributes
+        _check_content(checker, node.text) #calling checker(node) checks attributes
     except Exception as E:
-        error_list.append(E)
+        error_list.add_exception(E, checker, node, node.text)
     return error_list
 
 @validate_inputs
 @match_checker_to_node
-def check_node_ordered_children(checker, node):
+def check_node_ordered_children(checker, node, max_errors=None):
     """confirms nodes children are in order.
     Does not check those children
     """
-    error_list = []
-    expected = iter((child.name, child.min_occurs, child.max_occurs) for child in checker.children)
-
-
-    known = iter(node)
-    try:
-        this_known = known.next()
-        this_expected = expected.next()
-    except StopIteration:
-        this_known = None
-
-    ok = this_known is not None
-    while ok:
-
-        count = 0
-        current_tag = this_known.tag
-        #
-        if current_tag not in checker.child_names:
-            error_list.append(UnexpectedChildError(
-                'Unexpected "{0}" child found in "{1}" node'.format(
-                    current_tag, checker.name)))
-        #
-        while this_expected[0] == this_known.tag:
-            count += 1
-            try:
-                this_known = known.next()
-            except StopIteration:
-                ok = False
-                this_known = None
-                break
-
-        if count < this_expected[1]:
-            error_list.append(MissingChildError(
-                'Not enough "{0}" children in {1} node'.format(
-                    this_expected[0], current_tag)))
-        if count > this_expected[2]:
-            error_list.append(UnexpectedChildError(
-                'Too many "{0}" children in {1} node'.format(
-                    this_expected[0], current_tag)))
-
-        if this_known is None:
-            break
-
-        # move through all the expected children until we match this_known.tag
-        keep_feeding = True
-        while keep_feeding:
-            try:
-                this_expected = expected.next()
-                if this_expected[0] == this_known.tag:
-                    keep_feeding = False
-                elif this_expected[1] > 0:
-                    error_list.append(MissingChildError(
-                        'Missing "{0}" children in {1} node'.format(
-                            this_expected[0], node.tag)))
-            except StopIteration:
-                keep_feeding = False
-                ok = False
-
-    if this_known is not None:
-        error_list.append(UnexpectedChildError(
-            "Unexpected child {0}".format(this_known.tag)))
-        for n in known:
-            error_list.append(UnexpectedChildError(
-            "Unepected child {0}".format(n.tag)))
-
-    for this in expected:
-        if this[1]:
-            error_list.append(MissingChildError(
-                'Missing "{0}" child in "{1}" node'.format(this[0],node.tag)))
-
-    return error_list
+    return checker.child_order().check(node, ErrorList(max_errors))
 
 @validate_inputs
 @match_checker_to_node
-def check_node_unordered_children(checker, node):
-    error_list = []
-
+def check_node_unordered_children(checker, node, max_errors=None):
     # get a dictionary of min_occurs, max_occurs pairs
     limits = {}
     for child in checker.children:
         limits[child.name] = (child.min_occurs, child.max_occurs)
 
-    for child_name in limits:
-        real_kids = list(node.findall(child_name))
-        if len(real_kids) < limits[child_name][0]:
-            error_list.append(MissingChildError(
-                "Not enough '{0}' children in '{1}' node".format(
-                    child_name, checker.name)))
+    return _unordered_child_errors(checker.name, limits, node,
+        ErrorList(max_errors), checker)
+
+def _unordered_child_errors(checker_name, limits, node, error_list,
+        checker=None):
+    """the body of check_node_unordered_children. Adds errors to error_list
 
-        if len(real_kids) > limits[child_name][1]:
-            error_list.append(UnexpectedChildError(
-                "Too many '{0}' children in '{1}' node".format(
-                    child_name, checker.name)))
+    :param limits: dictionary of name: (min_occurs, max_occurs)
+
+    The children are counted in one pass, which also flags unknown tags.
+    """
+    counts = {}
+    unknown = []
+    for child in node:
+        tag = child.tag
+        if tag in counts:
+            counts[tag] += 1
+        else:
+            counts[tag] = 1
+        if tag not in limits:
+            unknown.append(tag)
+    return _unordered_count_errors(checker_name, limits, counts,
+        error_list, checker, node, unknown)
+
+def _unordered_count_errors(checker_name, limits, counts, error_list,
+        checker=None, node=None, unknown=()):
+    """checks the child counts of an unordered node. Adds errors to error_list
+
+    :param counts: dictionary of tag: number of children
+    :param unknown: the tags not in limits, once per child
+    """
+    for child_name, (min_occurs, max_occurs) in limits.items():
+        if error_list.full:
+            return error_list
+        found = counts.get(child_name, 0)
+        if found < min_occurs:
+            error_list.add(MissingChildError,
+                "Not enough '{0}' children in '{1}' node",
+                (child_name, checker_name), checker, node)
+
+        if found > max_occurs:
+            error_list.add(UnexpectedChildError,
+                "Too many '{0}' children in '{1}' node",
+                (child_name, checker_name), checker, node)
+
+    for tag in unknown:
+        if error_list.full:
+            return error_list
+        error_list.add(UnexpectedChildError,
+            'Undexpected "{0}" child in "{1}" node',
+            (tag, checker_name), checker, node)
 
     return error_list
 
 @validate_inputs
 @match_checker_to_node
-def check_node(checker, node):
-    ""
-    error_list = []
+def check_node(checker, node, max_errors=None):
+    """Checks the node and all of its children.
 
-    error_list.extend(check_attributes(checker, node))
-    error_list.extend(check_node_contents(checker, node))
+    Stops once max_errors errors are found. Use max_errors=1 to stop at the
+    first error.
+    """
+    return _check_node(checker, node, ErrorList(max_errors))
+
+def _check_node(checker, node, error_list):
+    """the body of check_node. Adds errors to error_list"""
+    _check_attributes(checker, node, error_list)
+    if error_list.full:
+        return error_list
+    _check_node_contents(checker, node, error_list)
+    if error_list.full:
+        return error_list
 
     if checker.ordered:
-        error_list.extend(check_node_ordered_children(checker, node))
+        checker.child_order().check(node, error_list)
     else:
-        error_list.extend(check_node_unordered_children(checker, node))
+        limits = {}
+        for child in checker.children:
+            limits[child.name] = (child.min_occurs, child.max_occurs)
+        _unordered_child_errors(checker.name, limits, node, error_list,
+            checker)
 
     for child in node:
+        if error_list.full:
+            return error_list
         child_check = checker.get(child.tag)
+        # same checks as the check_node decorators. The counting pass
+        # already flagged unknown children of unordered nodes
         if child_check is None:
-            error_list.append(UnexpectedChildError(
-                'Undexpected "{0}" child in "{1}" node'.format(
-                    child.tag, node.tag)))
-        error_list.extend(check_node(child_check, child))
+            if checker.ordered:
+                error_list.add(UnexpectedChildError,
+                    'Undexpected "{0}" child in "{1}" node',
+                    (child.tag, node.tag), checker, child)
+            error_list.add(NotACheckerError, "{0} is not an XCheck instance",
+                (child_check,), checker, child)
+        elif child_check.name != child.tag:
+            error_list.add(MismatchedTagError, '{0} checker given {1} node',
+                (child_check.name, child.tag), child_check, child)
+        else:
+            _check_node(child_check, child, error_list)
 
 
     return error_list
 
+# report, plan and stream use the check_ helpers above
+from memo import check_content as _check_content
+from report import ErrorRecord, ValidationReport, check_report
+from plan import ValidationPlan
+from stream import check_stream, _check_stream
+from batch import check_many
+
 if __name__=='__main__':
     from  utils import debug_formatter, indent
     oopslog = logging.getLogger('oopsCheck')
@@ -1,7 +1,78 @@
 import datetime
+import re
+
+from core import XCheck, CallOption, instrumentation
+from utils import get_bool, LRUCache
+
+# the same patterns datetime.strptime uses for the numeric directives.
+# Formats made only of these, like the ISO 8601 "%Y-%m-%dT%H:%M:%S", are
+# parsed with one regex match instead of a call to strptime.
+_NUMERIC_DIRECTIVES = {
+    'd': r"(?P<d>3[0-1]|[1-2]\d|0[1-9]|[1-9]| [1-9])",
+    'H': r"(?P<H>2[0-3]|[0-1]\d|\d)",
+    'm': r"(?P<m>1[0-2]|0[1-9]|[1-9])",
+    'M': r"(?P<M>[0-5]\d|\d)",
+    'S': r"(?P<S>6[0-1]|[0-5]\d|\d)",
+    'Y': r"(?P<Y>\d\d\d\d)",
+}
+_regex_chars = re.compile(r"([\\.^$*+?\(\){}\[\]|])")
+_whitespace = re.compile(r'\s+')
+
+def numeric_parser(fmt):
+    """numeric_parser(fmt) -> function or None
+    Returns a function that parses a string with fmt the way
+    datetime.strptime does, or None if fmt uses directives other than
+    %Y, %m, %d, %H, %M and %S. The function returns None if the string
+    does not match or is not a real date, where strptime would raise
+    ValueError.
+    """
+    pattern = _whitespace.sub(r'\\s+', _regex_chars.sub(r'\\\1', fmt))
+    parts = pattern.split('%')
+    regex = [parts[0]]
+    for part in parts[1:]:
+        if not part or part[0] not in _NUMERIC_DIRECTIVES:
+            return None
+        regex.append(_NUMERIC_DIRECTIVES[part[0]])
+        regex.append(part[1:])
+    try:
+        regex = re.compile(''.join(regex) + r'\Z', re.IGNORECASE)
+    except re.error:
+        return None
+    # strptime fills in missing fields with 1900-01-01 00:00:00
+    fields = [(name if name in regex.groupindex else None, default)
+        for name, default in [('Y', 1900), ('m', 1), ('d', 1), ('H', 0),
+            ('M', 0), ('S', 0)]]
+    match = regex.match
+
+    def parse(text):
+        found = match(text)
+        if found is None:
+            return None
+        group = found.group
+        try:
+            return datetime.datetime(*[int(group(name)) if name else default
+                for name, default in fields])
+        except ValueError:
+            # matched, but not a real date, like February 30
+            return None
+
+    return parse
+
+def strptime_parser(fmt):
+    """strptime_parser(fmt) -> function
+    Returns a function that parses a string with datetime.strptime, or
+    returns None if the string does not match fmt.
+    """
+    def parse(text):
+        try:
+            return datetime.datetime.strptime(text, fmt)
+        except ValueError:
+            return None
+
+    return parse
 
-from core import XCheck
-from utils import get_bool
+# marks a string that is not in the parse cache
+_unparsed = object()
 
 class DatetimeCheck(XCheck):
     """DateTimeCheck(name[, keywords])
@@ -18,6 +89,12 @@ class DatetimeCheck(XCheck):
     :type min_datetime: datetime.date (default Jan. 1, 1900)
     :param max_datetime: maximum date
     :type max_datetime: datetime.date (default datetime.date.max)
+    :param cache_size: number of parsed strings to remember
+    :type cache_size: int (default 1024)
+
+    Formats that only use %Y, %m, %d, %H, %M and %S, including the ISO 8601
+    formats, are parsed without calling strptime. Parsed strings are kept
+    in a cache, so repeated timestamps are only parsed once.
 
     Additional attributes in __call__
 
@@ -32,6 +109,15 @@ class DatetimeCheck(XCheck):
 
     """
 
+    as_datetime = CallOption('as_datetime')
+    as_date = CallOption('as_date')
+    as_struct = CallOption('as_struct')
+    as_string = CallOption('as_string')
+    memoize = True
+    _settings = XCheck._settings + ('allow_none', 'format', 'formats',
+        'min_datetime', 'max_datetime', 'as_datetime', 'as_date', 'as_struct',
+        'as_string')
+
     def __init__(self, name, **kwargs):
         self.allow_none = get_bool(kwargs.pop('ignore_case', False))
         self.format = kwargs.pop('format', "%a %b %d %H:%M:%S %Y")
@@ -39,10 +125,12 @@ class DatetimeCheck(XCheck):
         self.min_datetime = kwargs.pop('min_datetime',
             datetime.datetime.min.replace(year=1900))
         self.max_datetime = kwargs.pop('max_datetime', datetime.datetime.max)
+        self.cache_size = int(kwargs.pop('cache_size', 1024))
+        self._parse_key = None
         #print self.min_datetime
         XCheck.__init__(self, name, **kwargs)
         self._object_atts.extend(['allow_none', 'format', 'formats',
-            'min_datetime', 'max_datetime'])
+            'min_datetime', 'max_datetime', 'cache_size'])
 
 
         if not isinstance(self.min_datetime, datetime.datetime):
@@ -64,31 +152,59 @@ class DatetimeCheck(XCheck):
         self.as_string =  True
         self.as_date = False
 
+    def _parsers(self):
+        """returns the (format, parse function) pairs to try, in order, and
+        the cache of parsed strings. Both are rebuilt if the formats change.
+        """
+        key = (self.format, tuple(self.formats))
+        if key != self._parse_key:
+            parsers = []
+            for fmt in ([self.format] if self.format else []) + list(key[1]):
+                parse = numeric_parser(fmt) or strptime_parser(fmt)
+                parsers.append((fmt, parse))
+            self._parse_state = (parsers, LRUCache(self.cache_size))
+            self._parse_key = key
+        return self._parse_state
+
+    def __getstate__(self):
+        # the parse functions are closures, so they are rebuilt after
+        # unpickling
+        state = XCheck.__getstate__(self)
+        state.pop('_parse_state', None)
+        state['_parse_key'] = None
+        return state
+
+    def parse(self, text):
+        """parse(text) -> datetime.datetime or None
+        Returns the datetime from the first format that matches the text,
+        or None if none of them do.
+        """
+        parsers, cache = self._parsers()
+        parsed_date = cache.get(text, _unparsed)
+        if parsed_date is not _unparsed:
+            return parsed_date
+        parsed_date = None
+        for fmt, parse in parsers:
+            if instrumentation.debug:
+                self.logger.debug('Trying %s with format %s', text, fmt)
+            # None if this fails, so a different format is tried
+            parsed_date = parse(text)
+            if parsed_date is not None:
+                break
+        cache[text] = parsed_date
+        return parsed_date
+
     def check_content(self, item):
         ok = False
-        parsed_date = None
         is_none = False
 
-        if self.format:
-            self.logger.debug("Trying %s with format %s", item, self.format)
+        parsed_date = self.parse(str(item))
+        if parsed_date is not None:
             try:
-                parsed_date = datetime.datetime.strptime(str(item), self.format)
                 self._normalized_value = self.normalize_content(parsed_date)
                 ok = True
             except Exception:
-                self.logger.debug('Error, but will try again')
-                pass # if this fails, will try a different method
-
-        if not ok:
-            for fmt in self.formats:
-                self.logger.debug('Trying %s with format %s', item, fmt)
-                try:
-                    parsed_date = datetime.datetime.strptime(str(item), fmt)
-                    self._normalized_value = self.normalize_content(parsed_date)
-                    ok = True
-                    break
-                except:
-                    pass
+                parsed_date = None
 
         if self.allow_none and str(item).lower() == 'none':
             ok = True
@@ -96,7 +212,7 @@ class DatetimeCheck(XCheck):
             is_none = True
 
         if ok is False:
-            self.logger.error("Cannot parse %s as date" % item)
+            self.logger.error("Cannot parse %s as date", item)
             raise self.error("Cannot parse %s as date" % item)
 
         if not is_none and not (
@@ -107,17 +223,16 @@ class DatetimeCheck(XCheck):
         return ok
 
     def __call__(self, item, **kwargs):
-        self.as_datetime = kwargs.pop('as_datetime', False)
-        self.as_struct = kwargs.pop('as_struct', False)
-        self.as_string = kwargs.pop('as_string', False)
-        self.as_date = kwargs.pop('as_date', False)
-
+        options, kwargs = self._call_options(kwargs)
+        return self._call(item, options, **kwargs)
 
+    def _call_options(self, kwargs):
+        options = {}
+        for option in ('as_datetime', 'as_struct', 'as_string', 'as_date'):
+            options[option] = kwargs.pop(option, False)
 
-        kwargs['normalize'] = any(
-            [self.as_datetime, self.as_struct, self.as_string, self.as_date])
-
-        return XCheck.__call__(self, item, **kwargs)
+        kwargs['normalize'] = any(options.values())
+        return options, kwargs
 
     def normalize_content(self, item):
         #print 'normalizing', item
@@ -250,6 +365,59 @@ class DatetimeCheckTC(unittest.TestCase):
 
 ##        self.assertTrue(x(ET.fromstring('<a d="01-01"/>')))
 
+    def test_iso_format(self):
+        "DatetimeCheck() parses ISO 8601 formats without strptime"
+        d = DatetimeCheck('date', format='%Y-%m-%dT%H:%M:%S')
+        self.assertEqual(d('2014-03-22T10:11:12', as_datetime=True),
+            datetime.datetime(2014, 3, 22, 10, 11, 12))
+        self.assertRaises(d.error, d, '2014-02-30T10:11:12')
+        self.assertRaises(d.error, d, '2014-03-22T10:11:12Z')
+
+    def test_numeric_parser(self):
+        "numeric_parser() agrees with strptime"
+        for fmt, text in [('%Y-%m-%d', '2009-1-2'), ('%d/%m/%Y', ' 2/11/2009'),
+                ('%H:%M', '7:05'), ('%m-%d', '02-28'),
+                ('%Y %m %d', '2009  01\t02')]:
+            self.assertEqual(numeric_parser(fmt)(text),
+                datetime.datetime.strptime(text, fmt))
+        self.assertEqual(numeric_parser('%b %d %Y'), None)
+
+    def test_parsers_return_none(self):
+        "the parsers return None for text that does not match"
+        self.assertEqual(numeric_parser('%Y-%m-%d')('2009-13-01'), None)
+        self.assertEqual(numeric_parser('%Y-%m-%d')('2009-02-30'), None)
+        self.assertEqual(strptime_parser('%b %d %Y')('Feb 30 2009'), None)
+        self.assertEqual(strptime_parser('%b %d %Y')('Feb 3 2009'),
+            datetime.datetime(2009, 2, 3))
+
+    def test_formats_in_order(self):
+        "DatetimeCheck() uses the first format that matches"
+        d = DatetimeCheck('date', format='', formats=['%d-%m-%Y', '%m-%d-%Y'])
+        self.assertEqual(d('01-02-2009', as_date=True),
+            datetime.date(2009, 2, 1))
+        self.assertEqual(d('01-13-2009', as_date=True),
+            datetime.date(2009, 1, 13))
+
+    def test_parse_cache(self):
+        "DatetimeCheck() remembers parsed strings until the formats change"
+        d = DatetimeCheck('date', format='%Y-%m-%d', cache_size=2)
+        first = d.parse('2009-01-02')
+        self.assertTrue(d.parse('2009-01-02') is first)
+        self.assertEqual(d.parse('bad'), None)
+        d.formats = ['%d.%m.%Y']
+        self.assertEqual(d.parse('02.01.2009'), first)
+        d.format = ''
+        self.assertEqual(d.parse('2009-01-02'), None)
+
+    def test_pickle(self):
+        "DatetimeCheck can be pickled after parsing"
+        import pickle
+        d = DatetimeCheck('date', format='%Y-%m-%d')
+        d('2009-01-02')
+        copy = pickle.loads(pickle.dumps(d))
+        self.assertEqual(copy('2009-01-02', as_date=True),
+            datetime.date(2009, 1, 2))
+
 if __name__=='__main__':
 ##    logger = logging.getLogger()
 ##    logger.setLevel(logging.CRITICAL)
@@ -12,6 +12,7 @@ class InfinityPlus:
         return num.__class__ == self.__class__
     def __ne__(self,num):
         return not self.__eq__(num)
+    def __hash__(self): return hash(self.__class__)
     def __repr__(self): return "InfinityPlus"
     def __int__(self): raise ValueError, "Infinity cannot be converted to integer"
     def __float__(self): raise ValueError, "Infinity cannot be converted to float"
@@ -37,8 +38,36 @@ class InfinityMinus:
         else: return False
     def __ne__(self,num):
         return not self.__eq__(num)
+    def __hash__(self): return hash(self.__class__)
     def __repr__(self): return "InfinityMinus"
 
 INF = InfinityPlus()
 NINF = InfinityMinus()
 
+class Bound(object):
+    """Bound(name, default)
+    A checker setting for one end of a range, like max_length. It can be
+    a number, INF or NINF.
+
+    Setting it also stores the limit the checks compare against in
+    _<name>_limit. The limit is None for INF and NINF, so checks skip the
+    comparison instead of calling the Infinity methods.
+    """
+    def __init__(self, name, default):
+        self.name = name
+        self.default = default
+        self._key = '_%s_setting' % name
+        self._limit_key = '_%s_limit' % name
+
+    def __get__(self, checker, cls):
+        if checker is None:
+            return self
+        return checker.__dict__.get(self._key, self.default)
+
+    def __set__(self, checker, value):
+        checker.__dict__[self._key] = value
+        if value == INF or value == NINF:
+            checker.__dict__[self._limit_key] = None
+        else:
+            checker.__dict__[self._limit_key] = value
+
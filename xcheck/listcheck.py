@@ -1,8 +1,10 @@
+import collections
+import logging
 import operator
 
-from core import XCheckError, XCheck
+from core import XCheckError, XCheck, CallOption, instrumentation
 from boolcheck import BoolCheck
-from infinity import INF, NINF
+from infinity import INF, NINF, Bound
 
 class NoSelectionError(XCheckError):
     """SelectionCheck was not given a value to check"""
@@ -37,8 +39,15 @@ class SelectionCheck(XCheck):
 
     If a callback is specified, it will always be used over a static values
     list.
+
+    A static values list is turned into a set when `values` or `ignore_case`
+    is assigned. Assign a new list to change the values, rather than
+    changing the list in place.
     """
     _boolCheck = BoolCheck('caseSensitive')
+    memoize = True
+    _settings = XCheck._settings + ('values', 'ignore_case', 'allow_none')
+
     def __init__(self, name, **kwargs):
         if 'values' not in kwargs and 'callback' not in kwargs:
             raise NoSelectionError("Selection check must have iterable values or a callback function")
@@ -83,11 +92,30 @@ class SelectionCheck(XCheck):
     def values(self, value_list):
         self.logger.debug('setting values list for SelectionCheck')
         self._values = list(value_list)
+        self._build_lookup()
+
+    @property
+    def ignore_case(self):
+        return self._ignore_case
+
+    @ignore_case.setter
+    def ignore_case(self, value):
+        self._ignore_case = value
+        self._build_lookup()
+
+    def _build_lookup(self):
+        """stores the static values as a set, lowercased if ignoring case"""
+        values = self.__dict__.get('_values', [])
+        if self.__dict__.get('_ignore_case'):
+            self._lookup = frozenset(val.lower() for val in values)
+        else:
+            self._lookup = frozenset(values)
 
 
     def __call__(self, item, **kwargs):
-        self.logger.debug('__call__ %s with %s (allow_none is %s)',
-             self.name, item, self.allow_none)
+        if instrumentation.debug:
+            self.logger.debug('__call__ %s with %s (allow_none is %s)',
+                 self.name, item, self.allow_none)
         if item is None and self.allow_none:
             return True
 
@@ -95,21 +123,22 @@ class SelectionCheck(XCheck):
 
     def check_content(self, item):
         ok = None
-        self.logger.debug('%s: item is %s', self.name, item)
+        if instrumentation.debug:
+            self.logger.debug('%s: item is %s', self.name, item)
         if item is None and self.allow_none:
             return True
 
         item = str(item)
+        self.normalize_content(item)
         if self.callback:
             vals = self.callback()
+            if self._ignore_case:
+                vals = map(str.lower, vals)
         else:
-            vals = list(self.values)
+            vals = self._lookup
 
-
-        self.normalize_content(item)
-        if self.ignore_case:
+        if self._ignore_case:
             item = item.lower()
-            vals = map(str.lower, vals)
         if item not in vals:
             ok = False
             raise self.error(
@@ -151,6 +180,12 @@ class ListCheck(XCheck):
 
     """
     _boolCheck = BoolCheck('ignore_case')
+    as_string = CallOption('as_string')
+    max_items = Bound('max_items', INF)
+    memoize = True
+    _settings = XCheck._settings + ('delimiter', 'values', 'allow_duplicates',
+        'min_items', 'max_items', 'ignore_case', 'as_string')
+
     def __init__(self, name, **kwargs):
 
         self.delimiter = kwargs.pop('delimiter', ',')
@@ -190,6 +225,23 @@ class ListCheck(XCheck):
     def values(self, values_list):
         self.logger.debug('changing ListCheck values')
         self._values = list(values_list)
+        self._build_counts()
+
+    @property
+    def ignore_case(self):
+        return self._ignore_case
+
+    @ignore_case.setter
+    def ignore_case(self, value):
+        self._ignore_case = value
+        self._build_counts()
+
+    def _build_counts(self):
+        """counts the static values, lowercased if ignoring case"""
+        values = self.__dict__.get('_values', [])
+        if self.__dict__.get('_ignore_case'):
+            values = map(lower, values)
+        self._counts = collections.Counter(values)
 
     def normalize_content(self, items):
         "normalizes the content of the list"
@@ -213,29 +265,31 @@ class ListCheck(XCheck):
         if self.min_items > len(items):
             ok = False
             raise self.error, "not enough items in the list"
-        if self.max_items < len(items):
+        high = self._max_items_limit
+        if high is not None and high < len(items):
             ok = False
             raise self.error, "too many items in the list"
         if self.ignore_case:
-            vals = map(str.lower, self.values)
-            items = map(str.lower, items)
+            items = map(lower, items)
+        if self.callback:
+            vals = self.callback()
+            if self.ignore_case:
+                vals = map(lower, vals)
+            counts = collections.Counter(vals)
         else:
-            if self.callback:
-                vals = self.callback()
-            else:
-                vals = list(self.values)
+            counts = self._counts
 
-        if vals != []:
+        # each value can be used as many times as it appears in the values
+        # list, unless duplicates are allowed
+        if counts:
+            used = {}
+            allow_duplicates = self.allow_duplicates
             for item in items:
-                ok &= item in vals
-                if item not in vals:
+                if item not in counts or (not allow_duplicates
+                        and used.get(item, 0) >= counts[item]):
                     raise self.error, "Item %s not in values list(%s)" % \
                         (item, self.name)
-                if not self.allow_duplicates:
-                    try:
-                        vals.remove(item)
-                    except ValueError:
-                        raise self.error, "Item %s not in values list" % item
+                used[item] = used.get(item, 0) + 1
 
         if not ok:
             raise self.error, "sommat got borked"
@@ -243,10 +297,14 @@ class ListCheck(XCheck):
         return ok
 
     def __call__(self, item, **kwargs):
-        self.as_string = kwargs.pop('as_string', False)
-        if self.as_string:
+        options, kwargs = self._call_options(kwargs)
+        return self._call(item, options, **kwargs)
+
+    def _call_options(self, kwargs):
+        as_string = kwargs.pop('as_string', False)
+        if as_string:
             kwargs['normalize'] = True
-        return XCheck.__call__(self, item, **kwargs)
+        return {'as_string': as_string}, kwargs
 
     def dummy_value(self):
         if self.values:
@@ -308,6 +366,21 @@ class SelectionCheckTC(unittest.TestCase):
         "SelectionCheck() fails if value not in list of acceptable values"
         self.assertRaises(self.s.error, self.s, 'delta')
 
+    def testAssignValues(self):
+        "SelectionCheck() uses values assigned after creation"
+        self.s.values = ['delta']
+        self.failUnless(self.s('Delta'))
+        self.assertRaises(self.s.error, self.s, 'alpha')
+
+    def testMixedCaseValues(self):
+        "SelectionCheck() folds the case of the values when ignoring case"
+        s = SelectionCheck('choice', values=['Alpha', 'BETA'])
+        self.failUnless(s('alpha'))
+        self.failUnless(s('Beta'))
+        s.ignore_case = False
+        self.assertRaises(s.error, s, 'alpha')
+        self.failUnless(s('BETA'))
+
 class SelectionCallbackTC(unittest.TestCase):
     delta_ok = False
 
@@ -391,6 +464,26 @@ class ListCheckTC(unittest.TestCase):
         self.l.allow_duplicates = True
         self.failUnless(self.l('alpha, alpha'))
 
+    def testRepeatedValues(self):
+        "ListCheck allows a value as often as it appears in the values list"
+        l = ListCheck('letter', values=['alpha', 'alpha', 'gamma'])
+        self.failUnless(l('alpha, gamma, alpha'))
+        self.assertRaises(l.error, l, 'alpha, alpha, alpha')
+
+    def testAssignValues(self):
+        "ListCheck uses values and ignore_case assigned after creation"
+        self.l.values = ['Beta']
+        self.assertRaises(self.l.error, self.l, 'beta')
+        self.l.ignore_case = True
+        self.failUnless(self.l('beta'))
+
+    def testLongList(self):
+        "ListCheck checks every item of a long list"
+        values = ['v%d' % idx for idx in range(5000)]
+        l = ListCheck('letter', values=values, max_items=-1)
+        self.failUnless(l(', '.join(reversed(values))))
+        self.assertRaises(l.error, l, ', '.join(values + ['v1']))
+
     def testFailIfTooManyItems(self):
         "ListCheck fails if list has too many items"
         self.l.max_items = 2
@@ -26,10 +26,10 @@ class UnmatchedError(XCheckError): pass
 class BadCallbackError(XCheckError): pass
 
 INT_ATTRIBUTES = ['min_length', 'max_length', 'min_occurs',
-            'max_occurs', ]
+            'max_occurs', 'cache_size']
 
 BOOL_ATTRIBUTES = ['required', 'unique', 'check_children', 'ordered',
-    'allow_none', 'allow_blank', 'none_is_false']
+    'allow_none', 'allow_blank', 'none_is_false', 'full_match']
 
 STR_OR_NONE_ATTRIBUTES = ['pattern']
 
@@ -0,0 +1,225 @@
+"""memo
+Process-wide memoization of leaf content checks.
+
+Documents repeat the same leaf values over and over: status codes, currency
+codes, booleans, dates. When the content cache is turned on with
+set_content_cache, the check_ functions and ValidationPlan keep the result
+of check_content for each (checker settings, value) pair: the normalized
+value, or the class and arguments of the error it raised. The next time any
+checker with the same settings sees the same value, the result is replayed
+instead of checked. A replayed error is a new instance each time.
+
+The cache is off by default. Only checkers with ``memoize`` set are cached.
+The leaf checkers set it. SelectionCheck and ListCheck are only cached when
+their values are static, since a callback can give different values on each
+call.
+
+Each checker class lists the attributes check_content depends on in its
+_settings tuple. A subclass that adds settings extends the tuple. A
+checker's settings are read once and summed up as a small integer key.
+Assigning a setting (any attribute without a leading underscore) bumps the
+checker's _settings_version, so its next check is looked up under its new
+settings and the old entries age out of the cache. Changing a values list
+in place is not noticed. Assign a new list instead.
+"""
+__history__ = """
+2026-10-17 -        - Created
+"""
+
+import collections
+import itertools
+import threading
+
+from core import current_context, call_context, CallOption
+from utils import LRUCache
+
+__all__ = ['ContentCache', 'CacheInfo', 'content_cache', 'set_content_cache',
+    'content_cache_info']
+
+CacheInfo = collections.namedtuple('CacheInfo', 'hits misses maxsize currsize')
+
+# marks a check that did not set a normalized value
+_UNSET = object()
+
+
+def _setting(checker, name):
+    """returns the value of a setting. Call options give the value set on
+    the checker, since the cache keys the options of a call separately"""
+    option = getattr(type(checker), name, None)
+    if isinstance(option, CallOption):
+        return option.setting(checker)
+    return getattr(checker, name)
+
+def _freeze(value):
+    """returns a hashable copy of a setting"""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(each) for each in value)
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(val)) for key, val in value.items()))
+    if isinstance(value, (set, frozenset)):
+        return frozenset(value)
+    return value
+
+
+class ContentCache(object):
+    """ContentCache([maxsize])
+    An LRU cache of check_content results, shared by every checker in the
+    process. A maxsize of 0 turns it off. Use the module's content_cache
+    rather than creating another one.
+
+    cache.hits and cache.misses count the lookups since the cache was last
+    configured or cleared.
+    """
+    def __init__(self, maxsize=0):
+        self._lock = threading.Lock()
+        self._next_key = itertools.count()
+        self.configure(maxsize)
+
+    def configure(self, maxsize):
+        """sets the size of the cache and empties it"""
+        self.maxsize = int(maxsize)
+        self._cache = LRUCache(self.maxsize)
+        # settings: key. A key is only useful while results are kept under
+        # it, so there are never more keys than results
+        self._keys = LRUCache(self.maxsize)
+        self.clear()
+
+    def clear(self):
+        """empties the cache and resets the counters"""
+        self._cache.clear()
+        # keys are never reused, so checkers can keep the keys they have
+        self._keys.clear()
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+    def info(self):
+        """returns a CacheInfo of the hits, misses, maxsize and current size"""
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        return CacheInfo(hits, misses, self.maxsize, len(self._cache))
+
+    def key(self, checker):
+        """returns the key for the checker's settings, or None if its
+        results cannot be cached"""
+        state = checker.__dict__
+        version = state.get('_settings_version')
+        memo_key = state.get('_memo_key')
+        if memo_key is not None and memo_key[0] == version:
+            return memo_key[1]
+        if not checker.memoize or getattr(checker, 'callback', None):
+            # a callback can give different values on each call
+            return None
+        settings = [checker.__class__]
+        for name in checker._settings:
+            settings.append((name, _freeze(_setting(checker, name))))
+        settings = tuple(settings)
+        try:
+            hash(settings)
+        except TypeError:
+            return None
+        with self._lock:
+            key = self._keys.get(settings)
+            if key is None:
+                key = self._keys[settings] = next(self._next_key)
+        state['_memo_key'] = (version, key)
+        return key
+
+    def check(self, checker, item):
+        """check(checker, item)
+        Runs checker.check_content(item), or replays its cached result.
+        """
+        state = checker.__dict__
+        memo_key = state.get('_memo_key')
+        if memo_key is not None and memo_key[0] == state.get(
+                '_settings_version'):
+            key = memo_key[1]
+        else:
+            key = self.key(checker)
+            if key is None:
+                return checker.check_content(item)
+
+        # call options like as_string change the normalized value, but only
+        # for the checker that was called
+        context = current_context()
+        if context is not None and context.checker is checker:
+            options = context.options
+        else:
+            options = {}
+        try:
+            entry_key = (key, type(item), item,
+                tuple(sorted(options.items())) if options else ())
+            entry = self._cache.get(entry_key)
+        except TypeError:
+            # the value cannot be a dictionary key, like a list
+            return checker.check_content(item)
+
+        if entry is not None:
+            with self._lock:
+                self.hits += 1
+            result, value, error = entry
+            if error is not None:
+                # a new error each time, so no traceback or state is shared
+                # between calls
+                raise error[0](*error[1])
+            if value is not _UNSET:
+                if type(value) is list:
+                    value = value[:]
+                # what the _normalized_value setter does, without the
+                # property and __setattr__ calls
+                if context is not None:
+                    context.values[id(checker)] = value
+                else:
+                    checker.__dict__['_normalized_setting'] = value
+            return result
+
+        with self._lock:
+            self.misses += 1
+        # run the check in its own context to see whether it normalized
+        with call_context(checker, options) as inner:
+            try:
+                result = checker.check_content(item)
+            except Exception as error:
+                self._cache_error(entry_key, error)
+                raise
+        value = inner.values.get(id(checker), _UNSET)
+        if value is _UNSET:
+            self._cache[entry_key] = (result, value, None)
+            return result
+        stored = value[:] if type(value) is list else value
+        self._cache[entry_key] = (result, stored, None)
+        checker._normalized_value = value
+        return result
+
+    def _cache_error(self, entry_key, error):
+        """keeps the class and arguments of an error, if the class can be
+        called with the arguments to make it again"""
+        error_class, args = type(error), error.args
+        try:
+            error_class(*args)
+        except Exception:
+            return
+        self._cache[entry_key] = (None, _UNSET, (error_class, args))
+
+content_cache = ContentCache()
+
+def set_content_cache(maxsize=4096):
+    """set_content_cache([maxsize])
+    Turns on the content cache for all checkers, keeping up to maxsize
+    results. A maxsize of 0 turns it off. Either way the cache is emptied.
+    """
+    content_cache.configure(maxsize)
+
+def content_cache_info():
+    """returns a CacheInfo(hits, misses, maxsize, currsize) for the content
+    cache"""
+    return content_cache.info()
+
+def check_content(checker, item):
+    """check_content(checker, item)
+    Calls checker.check_content(item), through the content cache if it is
+    on. The check_ functions and ValidationPlan check values with this.
+    """
+    if content_cache.maxsize and checker.memoize:
+        return content_cache.check(checker, item)
+    return checker.check_content(item)
@@ -1,8 +1,143 @@
 import logging
-
-from core import XCheck, XCheckError
-from infinity import INF, NINF
-
+from array import array
+from decimal import Decimal, InvalidOperation
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from core import XCheck, XCheckError, CallOption, instrumentation
+from infinity import INF, NINF, Bound
+
+NAN = float('nan')
+
+_EXACT = 2 ** 53 # floats hold every integer below this exactly
+_NEG_EXACT = -_EXACT
+
+def _int_value(item):
+    """converts an IntCheck value. Values go through float(), which is
+    quicker than int() and accepts "3.0". Integers and strings too big for
+    a float to hold exactly are converted again exactly. Raises
+    ValueError if the value is not a whole number."""
+    number = float(item)
+    data = int(number)
+    if _NEG_EXACT < data < _EXACT:
+        if number != data:
+            raise ValueError("Item not an integer")
+        return data
+    if isinstance(item, (int, long)):
+        return int(item)
+    if isinstance(item, basestring):
+        try:
+            return int(item)
+        except ValueError:
+            pass # "1e30" or "9007199254740993.0"
+        try:
+            item = Decimal(item.strip())
+        except InvalidOperation:
+            raise ValueError("Item not an integer")
+    if isinstance(item, Decimal):
+        data = int(item)
+        if item != data:
+            raise ValueError("Item not an integer")
+        return data
+    if number != data:
+        raise ValueError("Item not an integer")
+    return data
+
+def _floats(values):
+    """returns float(value) for every value, NaN where float() fails, and
+    the indexes of the failures"""
+    try:
+        return map(float, values), []
+    except Exception:
+        pass
+    floats = []
+    bad = []
+    for idx, value in enumerate(values):
+        try:
+            floats.append(float(value))
+        except Exception:
+            floats.append(NAN)
+            bad.append(idx)
+    return floats, bad
+
+def _bulk_check(values, integral, low, high):
+    """check_many for IntCheck (integral) and DecimalCheck. low and high
+    are the checker's limits, None for no limit. Returns (mask, normalized)
+    """
+    # the checks below go over the values more than once, so an iterator
+    # is read into a list first
+    if not isinstance(values, (list, tuple)) and not (
+            numpy is not None and isinstance(values, numpy.ndarray)):
+        values = list(values)
+    if numpy is not None:
+        return _numpy_check(values, integral, low, high)
+
+    mask, normalized = _python_check(values, integral, low, high)
+    if integral:
+        try:
+            normalized = array('l', normalized)
+        except OverflowError:
+            pass # too big for a C long
+    else:
+        normalized = array('d', normalized)
+    return array('b', mask), normalized
+
+def _python_check(values, integral, low, high):
+    """checks the values one at a time. Returns lists"""
+    convert = _int_value if integral else float
+    invalid = 0 if integral else NAN
+    mask = []
+    normalized = []
+    for value in values:
+        try:
+            number = convert(value)
+        except Exception:
+            ok = False
+        else:
+            ok = (low is None or low <= number) and (
+                high is None or number <= high)
+        mask.append(ok)
+        normalized.append(number if ok else invalid)
+    return mask, normalized
+
+def _numpy_check(values, integral, low, high):
+    if isinstance(values, numpy.ndarray) and values.dtype.kind in 'bi':
+        floats = data = values.astype(numpy.int64)
+        mask = numpy.ones(len(data), dtype=bool)
+    else:
+        if isinstance(values, numpy.ndarray) and values.dtype.kind in 'uf':
+            floats = values.astype(float)
+            mask = numpy.ones(len(floats), dtype=bool)
+        else:
+            floats, bad = _floats(values)
+            floats = numpy.array(floats, dtype=float)
+            mask = numpy.ones(len(floats), dtype=bool)
+            mask[bad] = False
+        if integral:
+            finite = numpy.isfinite(floats)
+            if (numpy.abs(floats[finite]) >= _EXACT).any():
+                # floats cannot hold these exactly
+                mask, normalized = _python_check(values, True, low, high)
+                try:
+                    normalized = numpy.array(normalized, dtype=numpy.int64)
+                except OverflowError:
+                    normalized = numpy.array(normalized, dtype=object)
+                return numpy.array(mask, dtype=bool), normalized
+            data = numpy.trunc(floats)
+            mask &= finite & (data == floats)
+        else:
+            data = floats
+    with numpy.errstate(invalid='ignore'):
+        if low is not None:
+            mask &= data >= low
+        if high is not None:
+            mask &= data <= high
+    if not integral:
+        return mask, numpy.where(mask, data, NAN)
+    return mask, numpy.where(mask, data, 0).astype(numpy.int64)
 
 class IntCheck(XCheck):
     """IntCheck(name[, min, max])
@@ -19,9 +154,15 @@ class IntCheck(XCheck):
     The max and min attributes are inclusive, they default to NINF and INF,
     respectively.
     """
+    as_string = CallOption('as_string')
+    min = Bound('min', NINF)
+    max = Bound('max', INF)
+    memoize = True
+    _settings = XCheck._settings + ('min', 'max', 'as_string')
+
     def __init__(self, name, **kwargs):
-        self.min = NINF
-        self.max = INF
+        self.min = kwargs.pop('min', NINF)
+        self.max = kwargs.pop('max', INF)
         self.error = XCheckError
         XCheck.__init__(self, name, **kwargs)
         self._object_atts.extend(['min', 'max'])
@@ -59,25 +200,38 @@ class IntCheck(XCheck):
         return ok
 
     def check_content(self, item):
-        logging.debug('check_content(%s) type %s' % (item, type(item)))
-        ok = None
-        item = float(item)
-        data = int(item)
-
-        if item != data:
-            raise ValueError("Item not an integer")
-
-        ok = self.min <= data <= self.max
-        if not ok:
+        if instrumentation.debug:
+            self.logger.debug('check_content(%s) type %s', item, type(item))
+        data = _int_value(item)
+
+        low = self._min_limit
+        high = self._max_limit
+        if (low is not None and not low <= data) or (
+                high is not None and not data <= high):
             raise self.error("item is out of bounds")
-        self.normalize_content(item)
-        return ok
+        self.normalize_content(data)
+        return True
 
     def __call__(self, item, **kwargs):
-        self.as_string = kwargs.pop('as_string', False)
-        if self.as_string:
+        options, kwargs = self._call_options(kwargs)
+        return self._call(item, options, **kwargs)
+
+    def _call_options(self, kwargs):
+        as_string = kwargs.pop('as_string', False)
+        if as_string:
             kwargs['normalize'] = True
-        return XCheck.__call__(self, item, **kwargs)
+        return {'as_string': as_string}, kwargs
+
+    def check_many(self, values):
+        """check_many(values) -> (mask, normalized)
+        Checks a sequence of values at once, without calling the checker
+        for each one. Values are numbers or numeric strings, not elements.
+
+        mask is True for each valid value. normalized holds the integers,
+        with 0 for the invalid values. Both are NumPy arrays when NumPy is
+        installed, and array.array objects otherwise.
+        """
+        return _bulk_check(values, True, self._min_limit, self._max_limit)
 
     def dummy_value(self):
         return '0' if self.min == NINF else str(self.min)
@@ -97,10 +251,14 @@ class DecimalCheck(XCheck):
     The max and min attributes are inclusive, they default to NINF and INF,
     respectively.
     """
+    min = Bound('min', NINF)
+    max = Bound('max', INF)
+    memoize = True
+    _settings = XCheck._settings + ('min', 'max')
 
     def __init__(self, name, **kwargs):
-        self.min = NINF
-        self.max = INF
+        self.min = kwargs.pop('min', NINF)
+        self.max = kwargs.pop('max', INF)
         self.error = XCheckError
         XCheck.__init__(self, name, **kwargs)
         self._object_atts.extend(['min', 'max'])
@@ -120,15 +278,21 @@ class DecimalCheck(XCheck):
         if ok is not None:
             return ok
 
-        ok = True
-        ok &= (self.min <= data )
-        if not ok:
+        low = self._min_limit
+        if low is not None and not low <= data:
             raise self.error, "%f too low" % data
-        ok &= (data <= self.max)
-        if not ok:
+        high = self._max_limit
+        if high is not None and not data <= high:
             raise self.error, "%f too high" % data
         self.normalize_content(data)
-        return ok
+        return True
+
+    def check_many(self, values):
+        """check_many(values) -> (mask, normalized)
+        Checks a sequence of values at once. See IntCheck.check_many.
+        normalized holds the floats, with NaN for the invalid values.
+        """
+        return _bulk_check(values, False, self._min_limit, self._max_limit)
 
     def dummy_value(self):
         return '0' if self.min == NINF else str(self.min)
@@ -219,6 +383,35 @@ class IntCheckTC(unittest.TestCase):
     def test_bugfix004(self):
         self.assertEqual(self.t(9, as_string=True), '9')
 
+    def test_large_integer_string(self):
+        "IntCheck() keeps integers beyond float precision exact"
+        big = IntCheck('big')
+        self.assertEqual(big('12345678901234567891', normalize=True),
+            12345678901234567891L)
+        self.assertEqual(big(9007199254740993, normalize=True),
+            9007199254740993)
+        self.assertEqual(big.check_many(['9007199254740993'])[1][0],
+            9007199254740993)
+
+    def test_large_float_string(self):
+        "IntCheck() parses large float strings exactly"
+        big = IntCheck('big')
+        self.assertEqual(big('9007199254740993.0', normalize=True),
+            9007199254740993)
+        self.assertEqual(big('1e30', normalize=True), 10 ** 30)
+        self.assertRaises(ValueError, big.check_content,
+            '12345678901234567891.5')
+        self.assertRaises(ValueError, big.check_content,
+            '9007199254740993.5')
+        mask, normalized = big.check_many(['9007199254740993.0',
+            '12345678901234567891.5', '3'])
+        self.assertEqual(list(mask), [True, False, True])
+        self.assertEqual(list(normalized), [9007199254740993, 0, 3])
+
+    def test_float_string_normalization(self):
+        self.assertEqual(self.t('6.0', normalize=True), 6)
+        self.assertTrue(isinstance(self.t('6.0', normalize=True), int))
+
 class DecimalCheckTC(unittest.TestCase):
     "These test if the defaults are created properly"
     def setUp(self):
@@ -263,6 +456,98 @@ class DecimalCheckTC(unittest.TestCase):
     def test_fail_with_crap_value(self):
         self.assertRaises(ValueError, self.t, 'fail')
 
+    def test_check_many(self):
+        "DecimalCheck.check_many() marks the values the checker rejects"
+        mask, values = self.t.check_many([5, '4.5', '0.5', 'fail', None])
+        self.assertEqual([bool(ok) for ok in mask],
+            [True, True, False, False, False])
+        self.assertEqual(list(values[:2]), [5.0, 4.5])
+        self.assertTrue(values[2] != values[2])
+
+class BoundsTC(unittest.TestCase):
+    def test_unbounded(self):
+        "An infinite bound is not compared"
+        t = IntCheck('test')
+        self.assertEqual((t.min, t.max), (NINF, INF))
+        self.assertEqual((t._min_limit, t._max_limit), (None, None))
+        self.failUnless(t(10 ** 20))
+
+    def test_change_bounds(self):
+        "Changing min and max after creation changes the limits"
+        t = DecimalCheck('test', max=10)
+        self.assertRaises(t.error, t, 11)
+        t.max = INF
+        self.failUnless(t(11))
+        t.min = 12
+        self.assertRaises(t.error, t, 11)
+        self.assertEqual(t._min_limit, 12)
+
+class BulkCheckTC(unittest.TestCase):
+    def test_int_check_many(self):
+        "IntCheck.check_many() agrees with calling the checker"
+        t = IntCheck('test', min=1, max=10)
+        items = [9, '6', 6.0, '6.0', '', -4, 5.6, '45', '5.5', None, 'nan']
+        mask, values = t.check_many(items)
+        for item, ok, value in zip(items, mask, values):
+            try:
+                expected = t(item, normalize=True)
+            except Exception:
+                self.assertFalse(ok, item)
+            else:
+                self.assertTrue(ok, item)
+                self.assertEqual(value, expected)
+
+    def test_unbounded(self):
+        "check_many() handles values too big for a machine integer"
+        mask, values = IntCheck('test').check_many(['1e30', 2 ** 70, 'inf'])
+        self.assertEqual([bool(ok) for ok in mask], [True, True, False])
+        self.assertEqual(values[1], 2 ** 70)
+
+    def test_empty(self):
+        mask, values = IntCheck('test').check_many([])
+        self.assertEqual((len(mask), len(values)), (0, 0))
+
+    def test_generator(self):
+        "check_many() reads an iterator once"
+        mask, values = IntCheck('test', max=5).check_many(
+            str(idx) for idx in range(4, 8))
+        self.assertEqual([bool(ok) for ok in mask], [True, True, False, False])
+        self.assertEqual(list(values), [4, 5, 0, 0])
+        mask, values = DecimalCheck('test').check_many(
+            iter(['1.5', 'x', '2']))
+        self.assertEqual([bool(ok) for ok in mask], [True, False, True])
+
+    def test_python_path(self):
+        "the loop used without NumPy agrees with calling the checker"
+        items = [9, '6', 6.0, '6.0', '', -4, 5.6, '45', None]
+        mask, values = _python_check(items, True, 1, 10)
+        self.assertEqual(mask,
+            [True, True, True, True, False, False, False, False, False])
+        self.assertEqual(values[:4], [9, 6, 6, 6])
+
+@unittest.skipIf(numpy is None, "NumPy is not installed")
+class NumpyBulkCheckTC(unittest.TestCase):
+    def test_int_arrays(self):
+        "_numpy_check() handles strings and integer and float arrays"
+        for values in [['3', '4.0', 'x', '11'],
+                numpy.array([3, 4, 0, 11]),
+                numpy.array([3.0, 4.0, 0.5, 11.0])]:
+            mask, normalized = _numpy_check(values, True, 1, 10)
+            self.assertEqual(list(mask[:2]), [True, True])
+            self.assertEqual(list(mask[2:]), [False, False])
+            self.assertEqual(list(normalized[:2]), [3, 4])
+
+    def test_large_values(self):
+        "_numpy_check() keeps integers beyond 2**53 exact"
+        mask, normalized = _numpy_check(['9007199254740993', '2'], True,
+            None, None)
+        self.assertEqual(list(normalized), [9007199254740993, 2])
+
+    def test_decimal(self):
+        mask, normalized = _numpy_check(['1.5', 'x'], False, 0, None)
+        self.assertEqual(list(mask), [True, False])
+        self.assertEqual(normalized[0], 1.5)
+
 
 if __name__=='__main__':
     logger = logging.getLogger()
@@ -0,0 +1,252 @@
+"""plan
+Compiled validation plans.
+
+XCheck.compile() turns a checker tree into a ValidationPlan. The plan is a
+flat table of steps, one per checker, holding everything check_node looks
+up while it works: the attribute checkers, the check_content method, the
+child occurrence limits and a tag -> step dispatch table. Running a plan
+walks the element once with an explicit stack instead of recursing through
+the check_ functions and their decorators.
+
+A plan is a snapshot. Compile the checker again after changing it.
+"""
+__history__ = """
+2026-10-17 -        - Created
+"""
+
+from core import XCheck, ET, MismatchedTagError, UnknownXMLAttributeError
+from core import MissingAttributeError, UnexpectedChildError
+from core import NotACheckerError, NotAnElementError, ErrorList
+from core import _unordered_child_errors, refresh_instrumentation
+from report import ValidationReport
+from memo import content_cache, check_content
+from utils import get_elem
+
+__all__ = ['ValidationPlan']
+
+
+class _Step(object):
+    """The compiled form of one checker"""
+    __slots__ = ('checker', 'name', 'attributes', 'attribute_names',
+        'check_content', 'memoize', 'ordered', 'child_order', 'limits',
+        'needs_children', 'dispatch')
+
+    def __setattr__(self, key, val):
+        raise AttributeError("ValidationPlan steps are read-only")
+
+    def _freeze(self, **kwargs):
+        for key, val in kwargs.items():
+            object.__setattr__(self, key, val)
+
+
+class ValidationPlan(object):
+    """ValidationPlan(checker)
+    A compiled, read-only form of a checker tree. Use XCheck.compile()
+    to create one.
+
+    plan.check(node) returns the same list of errors as
+    check_node(checker, node). Calling the plan raises the first error,
+    the same way calling the checker does.
+    """
+    def __init__(self, checker):
+        if not isinstance(checker, XCheck):
+            raise NotACheckerError("{0} is not an XCheck instance".format(
+                checker))
+        self._checker = checker
+        # steps for tags resolved at run time, by (checker id, tag)
+        self._lookups = {}
+        self._steps = {}
+        self._root = self._compile(checker)
+        self.steps = tuple(self._steps.values())
+        del self._steps
+
+    @property
+    def checker(self):
+        """returns the checker the plan was compiled from"""
+        return self._checker
+
+    def _compile(self, checker):
+        """returns the step for the checker, compiling its descendants"""
+        if id(checker) in self._steps:
+            return self._steps[id(checker)]
+
+        step = _Step()
+        self._steps[id(checker)] = step
+
+        attributes = tuple((name, att, att.required, att.check_content,
+            att.memoize) for name, att in checker.attributes.items())
+        limits = {}
+        for child in checker.children:
+            limits[child.name] = (child.min_occurs, child.max_occurs)
+
+        # every name checker.get can resolve, so unknown tags are the
+        # only ones that need a lookup at run time
+        dispatch = {}
+        for token in checker.tokens():
+            dispatch[token] = checker.get(token)
+
+        step._freeze(checker=checker,
+            name=checker.name,
+            attributes=attributes,
+            attribute_names=frozenset(checker.attributes),
+            check_content=checker.check_content,
+            memoize=checker.memoize,
+            ordered=checker.ordered,
+            child_order=checker.child_order(),
+            limits=limits,
+            needs_children=any(child.min_occurs > 0
+                for child in checker.children),
+            dispatch=dispatch)
+
+        for token, found in dispatch.items():
+            if found is not None:
+                dispatch[token] = self._compile(found)
+        return step
+
+    def _lookup(self, step, tag):
+        """resolves a tag that is not in the dispatch table. The result is
+        kept, so each tag is compiled once per checker"""
+        key = (id(step.checker), tag)
+        try:
+            return self._lookups[key]
+        except KeyError:
+            pass
+        found = step.checker.get(tag)
+        if found is not None:
+            found = ValidationPlan(found)._root
+        self._lookups[key] = found
+        return found
+
+    def check(self, node, max_errors=None):
+        """check(node[, max_errors]) -> list of errors
+        Validates the element. Returns the same errors, in the same order,
+        as check_node(checker, node, max_errors).
+        """
+        if not ET.iselement(node):
+            return [NotAnElementError("{0} is not an Element".format(node))]
+        return self._run(node, ErrorList(max_errors))
+
+    def report(self, node, max_errors=None):
+        """report(node[, max_errors]) -> ValidationReport
+        Validates the element. The report formats error messages only when
+        they are asked for.
+        """
+        if not ET.iselement(node):
+            report = ValidationReport()
+            report.add(NotAnElementError, "{0} is not an Element", (node,))
+            return report
+        return self._run(node, ValidationReport(max_errors, node))
+
+    def _run(self, node, error_list):
+        """validates the element, adding errors to error_list"""
+        refresh_instrumentation()
+        # the content cache can be turned on after the plan is compiled
+        cached = content_cache.check if content_cache.maxsize else None
+        add = error_list.add
+        add_exception = error_list.add_exception
+        stack = [(self._root, node, None)]
+        pop = stack.pop
+        push = stack.append
+
+        while stack:
+            if error_list.full:
+                break
+            step, node, parent = pop()
+
+            if step is None:
+                if parent.checker.ordered:
+                    add(UnexpectedChildError,
+                        'Undexpected "{0}" child in "{1}" node',
+                        (node.tag, parent.name), parent.checker, node)
+                add(NotACheckerError, "{0} is not an XCheck instance",
+                    (None,), parent.checker, node)
+                continue
+
+            if step.name != node.tag:
+                add(MismatchedTagError, '{0} checker given {1} node',
+                    (step.name, node.tag), step.checker, node)
+                continue
+
+            # attributes
+            node_atts = node.attrib
+            for att, att_check, required, check_content, memoize in \
+                    step.attributes:
+                value = node_atts.get(att)
+                if value is None:
+                    if required:
+                        add(MissingAttributeError,
+                            "{0} missing required '{1}' attribute",
+                            (step.name, att), att_check, node)
+                    continue
+                try:
+                    if cached and memoize:
+                        cached(att_check, value)
+                    else:
+                        check_content(value)
+                except Exception as E:
+                    add_exception(E, att_check, node, value)
+            if error_list.full:
+                break
+            if node_atts:
+                for na in node_atts:
+                    if na not in step.attribute_names:
+                        add(UnknownXMLAttributeError,
+                            "'{0}' attribute found in {1} node",
+                            (na, node.tag), step.checker, node, node_atts[na])
+
+            # contents
+            try:
+                if cached and step.memoize:
+                    cached(step.checker, node.text)
+                else:
+                    step.check_content(node.text)
+            except Exception as E:
+                add_exception(E, step.checker, node, node.text)
+            if error_list.full:
+                break
+
+            # structure of the children. A childless node can only fail
+            # if the checker requires children
+            children = node[:]
+            if children or step.needs_children:
+                if step.ordered:
+                    step.child_order.check(node, error_list)
+                else:
+                    _unordered_child_errors(step.name, step.limits, node,
+                        error_list, step.checker)
+
+            # the children themselves, in document order
+            if children:
+                dispatch = step.dispatch
+                for child in reversed(children):
+                    try:
+                        child_step = dispatch[child.tag]
+                    except KeyError:
+                        child_step = self._lookup(step, child.tag)
+                    push((child_step, child, step))
+
+        return error_list
+
+    def __call__(self, arg, fail_fast=False, max_errors=None):
+        """validates an element, xml-formatted string or value.
+        Returns True or raises the first error"""
+        if fail_fast:
+            max_errors = 1
+        if ET.iselement(arg):
+            res = self.report(arg, max_errors)
+        else:
+            try:
+                res = self.report(get_elem(arg), max_errors)
+            except ValueError:
+                res = ValidationReport()
+                try:
+                    check_content(self._checker, arg)
+                except Exception as E:
+                    res.add_exception(E, self._checker, None, arg)
+        if res:
+            raise res.first()
+        return True
+
+    def __repr__(self):
+        return "<ValidationPlan for %sCheck (%d steps)>" % (
+            self._checker.name, len(self.steps))
@@ -0,0 +1,167 @@
+"""report
+Validation reports with lazily formatted errors.
+
+A ValidationReport is an ErrorList that holds ErrorRecords instead of
+exceptions. A record keeps the error class, the message template and its
+arguments, the checker, the node and the raw value. The message is only
+formatted, and the exception only created, when they are asked for. Bulk
+runs that only count errors or look at the first one skip the formatting.
+"""
+__history__ = """
+2026-10-17 -        - Created
+"""
+
+import collections
+import operator
+
+from core import XCheck, ET, ErrorList, NotACheckerError, NotAnElementError
+from core import MismatchedTagError, refresh_instrumentation, _check_node
+
+__all__ = ['ErrorRecord', 'ValidationReport', 'check_report']
+
+
+class ErrorRecord(tuple):
+    """ErrorRecord(error_class, template, args[, checker, node, value])
+    One problem found while validating.
+
+    error_class -- the class of the error
+    checker -- the checker that found the problem
+    node -- the element with the problem, if any
+    value -- the raw attribute value or text, if any
+
+    message and error are built when they are used. Records are tuples,
+    which are much cheaper to create than exceptions.
+    """
+    __slots__ = ()
+
+    def __new__(cls, error_class, template, args, checker=None, node=None,
+            value=None, error=None):
+        return _new_record(cls, (error_class, template, args, checker, node,
+            value, error))
+
+    error_class = property(operator.itemgetter(0))
+    template = property(operator.itemgetter(1))
+    args = property(operator.itemgetter(2))
+    checker = property(operator.itemgetter(3))
+    node = property(operator.itemgetter(4))
+    value = property(operator.itemgetter(5))
+
+    @classmethod
+    def from_exception(cls, error, checker=None, node=None, value=None):
+        """returns a record for an error a checker raised"""
+        return cls(error.__class__, None, None, checker, node, value, error)
+
+    @property
+    def message(self):
+        """the human-readable message"""
+        if self[6] is None:
+            return self[1].format(*self[2])
+        return str(self[6])
+
+    @property
+    def error(self):
+        """the exception for this record. Errors raised by a checker are
+        returned as they were raised"""
+        if self[6] is None:
+            return self[0](self.message)
+        return self[6]
+
+    def __str__(self):
+        return self.message
+
+    def __repr__(self):
+        return "<ErrorRecord %s>" % self[0].__name__
+
+_new_record = tuple.__new__
+
+
+class ValidationReport(ErrorList):
+    """ValidationReport([max_errors, root])
+    The ErrorRecords found by a validation, in the order check_node finds
+    them. root is the element that was validated.
+    """
+    def __init__(self, max_errors=None, root=None):
+        ErrorList.__init__(self, max_errors)
+        self.root = root
+        self._parents = None
+
+    def add(self, error_class, template, args, checker=None, node=None,
+            value=None):
+        if self.max_errors is None or len(self) < self.max_errors:
+            list.append(self, _new_record(ErrorRecord, (error_class,
+                template, args, checker, node, value, None)))
+
+    def add_exception(self, error, checker=None, node=None, value=None):
+        if self.max_errors is None or len(self) < self.max_errors:
+            list.append(self, _new_record(ErrorRecord, (error.__class__,
+                None, None, checker, node, value, error)))
+
+    @property
+    def ok(self):
+        """True if nothing was found"""
+        return not self
+
+    def first(self):
+        """returns the exception for the first record, or None"""
+        if self:
+            return self[0].error
+        return None
+
+    def errors(self):
+        """returns the exceptions, the same list check_node returns"""
+        return [record.error for record in self]
+
+    def messages(self):
+        """returns the formatted messages"""
+        return [record.message for record in self]
+
+    def counts(self):
+        """returns a dictionary of error class name: number of records"""
+        return dict(collections.Counter(
+            record.error_class.__name__ for record in self))
+
+    def path(self, record):
+        """path(record) -> str
+        Returns the location of the record's node under the root, like
+        /feed/item[2]/qty, or None if it is not under the root.
+        """
+        node = record.node
+        if node is None or self.root is None:
+            return None
+        if self._parents is None:
+            walk = getattr(self.root, 'iter', self.root.getiterator)
+            self._parents = dict((child, parent)
+                for parent in walk() for child in parent)
+        steps = []
+        while node is not self.root:
+            parent = self._parents.get(node)
+            if parent is None:
+                return None
+            same = [child for child in parent if child.tag == node.tag]
+            if len(same) > 1:
+                steps.append('%s[%d]' % (node.tag, same.index(node) + 1))
+            else:
+                steps.append(node.tag)
+            node = parent
+        steps.append(self.root.tag)
+        return '/' + '/'.join(reversed(steps))
+
+
+def check_report(checker, node, max_errors=None):
+    """check_report(checker, node[, max_errors]) -> ValidationReport
+    Checks the node and all of its children, like check_node, but returns
+    a ValidationReport.
+    """
+    report = ValidationReport(max_errors, node)
+    refresh_instrumentation()
+    if not isinstance(checker, XCheck):
+        report.add(NotACheckerError, "{0} is not an XCheck instance",
+            (checker,))
+    elif not ET.iselement(node):
+        report.add(NotAnElementError, "{0} is not an Element", (node,))
+    elif checker.name != node.tag:
+        report.add(MismatchedTagError, '{0} checker given {1} node',
+            (checker.name, node.tag), checker, node)
+    else:
+        _check_node(checker, node, report)
+    return report
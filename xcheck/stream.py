@@ -0,0 +1,137 @@
+"""stream
+Streaming validation for documents too large to load.
+
+check_stream reads the document with ElementTree.iterparse. Each element is
+checked when its end tag is read, then cleared and removed from its parent,
+so memory grows with the depth of the document, not its size.
+
+The errors are the same as check_node finds, but they are reported in the
+order the elements end: an element's children are reported before the
+element itself.
+"""
+__history__ = """
+2026-10-17 -        - Created
+"""
+
+from core import XCheck, ET, ErrorList, NotACheckerError
+from core import MismatchedTagError, UnexpectedChildError
+from core import _check_attributes, _check_node_contents
+from core import _unordered_count_errors, refresh_instrumentation
+
+__all__ = ['check_stream']
+
+
+class _Frame(object):
+    """An open element and the state of its child structure check"""
+    __slots__ = ('checker', 'elem', 'structure_errors', 'run', 'counts',
+        'limits', 'unknown')
+
+    def __init__(self, checker, elem, error_class):
+        self.checker = checker
+        self.elem = elem
+        self.structure_errors = error_class()
+        if checker.ordered:
+            self.run = checker.child_order().start(elem.tag,
+                self.structure_errors)
+        else:
+            self.run = None
+            self.counts = {}
+            self.unknown = []
+            self.limits = dict((child.name,
+                (child.min_occurs, child.max_occurs))
+                for child in checker.children)
+
+    def add_child(self, tag):
+        """records a child tag for the structure check"""
+        if self.run is not None:
+            self.run.feed(tag)
+        else:
+            if tag in self.counts:
+                self.counts[tag] += 1
+            else:
+                self.counts[tag] = 1
+            if tag not in self.limits:
+                self.unknown.append(tag)
+
+    def finish(self):
+        """returns the structure errors"""
+        if self.run is not None:
+            return self.run.finish()
+        return _unordered_count_errors(self.checker.name, self.limits,
+            self.counts, self.structure_errors, unknown=self.unknown)
+
+
+def _release(stack, elem):
+    """frees a checked element"""
+    elem.clear()
+    if stack:
+        stack[-1].elem.remove(elem)
+
+
+def check_stream(checker, source, max_errors=None):
+    """check_stream(checker, source[, max_errors]) -> list of errors
+
+    Validates the document in source, a file name or file object, without
+    building the whole tree. Stops reading once max_errors errors are found.
+    """
+    if not isinstance(checker, XCheck):
+        return [NotACheckerError("{0} is not an XCheck instance".format(
+            checker))]
+    return _check_stream(checker, source, ErrorList(max_errors))
+
+def _check_stream(checker, source, error_list):
+    """the body of check_stream. Adds errors to error_list"""
+    refresh_instrumentation()
+    stack = []
+    # depth inside a subtree with no checker. It is not checked
+    skipping = 0
+
+    for event, elem in ET.iterparse(source, ('start', 'end')):
+        if event == 'start':
+            if skipping:
+                skipping += 1
+                continue
+
+            if stack:
+                parent = stack[-1]
+                parent.add_child(elem.tag)
+                child_check = parent.checker.get(elem.tag)
+                if child_check is None:
+                    if parent.checker.ordered:
+                        error_list.add(UnexpectedChildError,
+                            'Undexpected "{0}" child in "{1}" node',
+                            (elem.tag, parent.elem.tag), parent.checker)
+                    error_list.add(NotACheckerError,
+                        "{0} is not an XCheck instance",
+                        (child_check,), parent.checker)
+                    skipping = 1
+                    continue
+            else:
+                child_check = checker
+
+            if child_check.name != elem.tag:
+                error_list.add(MismatchedTagError,
+                    '{0} checker given {1} node',
+                    (child_check.name, elem.tag), child_check)
+                skipping = 1
+                continue
+
+            stack.append(_Frame(child_check, elem, error_list.__class__))
+
+        else:
+            if skipping:
+                skipping -= 1
+                if not skipping:
+                    _release(stack, elem)
+                continue
+
+            frame = stack.pop()
+            _check_attributes(frame.checker, elem, error_list)
+            _check_node_contents(frame.checker, elem, error_list)
+            error_list.extend(frame.finish())
+            _release(stack, elem)
+
+        if error_list.full:
+            break
+
+    return error_list
@@ -1,12 +1,36 @@
 import re
+from urlparse import urlsplit
 
 from core import XCheck
-from infinity import INF
+from infinity import INF, Bound
+from utils import LRUCache
+
+# compiled patterns shared by every checker, keyed by (pattern, full_match).
+# The re module only caches a hundred or so patterns, so a schema with more
+# than that would recompile them on every call. Checkers keep their own
+# compiled pattern, so dropping one from here only stops it being shared.
+_regex_cache = LRUCache(1024)
+
+def compile_pattern(pattern, full_match=False):
+    """compile_pattern(pattern[, full_match]) -> compiled regex
+    Returns the compiled pattern, sharing it with every other checker that
+    uses the same pattern. With full_match the pattern must match the whole
+    text.
+    """
+    key = (pattern, full_match)
+    regex = _regex_cache.get(key)
+    if regex is None:
+        if full_match:
+            regex = re.compile(r'(?:%s)\Z' % pattern)
+        else:
+            regex = re.compile(pattern)
+        _regex_cache[key] = regex
+    return regex
 
 #todo: Add no_spaces_allowed option (default False)
 # note: TextCheck does not offer the allow_none attribute. Should it?
 class TextCheck(XCheck):
-    """TextCheck(name[, min_length, max_length, pattern])
+    """TextCheck(name[, min_length, max_length, pattern, full_match])
     TextCheck validates text or elements with string values
 
     :param min_length: Minimum length of text (default 0)
@@ -14,14 +38,59 @@ class TextCheck(XCheck):
     :param max_length: Maximum length of text (default INF)
     :type max_length: integer or INF
     :param pattern: regex that can be used to check the text (default None)
+    :param full_match: the pattern must match all of the text, not just
+        part of it (default False)
+    :type full_match: boolean
 
+    The pattern is compiled when it is set.
     """
+    max_length = Bound('max_length', INF)
+    memoize = True
+    _settings = XCheck._settings + ('min_length', 'max_length', 'pattern',
+        'full_match')
+
     def __init__(self, name, **kwargs):
         self.min_length = 0
-        self.max_length = INF
-        self.pattern = None
+        self.max_length = kwargs.pop('max_length', INF)
+        self._pattern = None
+        self._full_match = False
+        self._regex = None
+        self.full_match = kwargs.pop('full_match', False)
+        self.pattern = kwargs.pop('pattern', None)
         XCheck.__init__(self, name, **kwargs)
-        self._object_atts.extend(['min_length', 'max_length', 'pattern'])
+        self._object_atts.extend(['min_length', 'max_length', 'pattern',
+            'full_match'])
+
+    @property
+    def pattern(self):
+        """the regex the text is checked against, or None"""
+        return self._pattern
+
+    @pattern.setter
+    def pattern(self, value):
+        self._pattern = value
+        self._compile_pattern()
+
+    @property
+    def full_match(self):
+        """True if the pattern must match the whole text"""
+        return self._full_match
+
+    @full_match.setter
+    def full_match(self, value):
+        self._full_match = bool(value)
+        self._compile_pattern()
+
+    def _compile_pattern(self):
+        if self._pattern is None:
+            self._regex = None
+        else:
+            self._regex = compile_pattern(self._pattern, self._full_match)
+
+    def __setstate__(self, state):
+        # share the compiled pattern again after unpickling
+        XCheck.__setstate__(self, state)
+        self._compile_pattern()
 
     def check_content(self, item):
         ok = isinstance(item, basestring)
@@ -33,11 +102,17 @@ class TextCheck(XCheck):
         if  len(item) < self.min_length:
             ok = False
             raise self.error("Text too short")
-        if len(item) > self.max_length:
+        high = self._max_length_limit
+        if high is not None and len(item) > high:
             ok = False
             raise self.error("Text too long")
-        if self.pattern is not None:
-            if not bool(re.search( self.pattern, item) ):
+        regex = self._regex
+        if regex is not None:
+            if self._full_match:
+                found = regex.match(item)
+            else:
+                found = regex.search(item)
+            if found is None:
                 ok = False
                 raise self.error("Text failed to match pattern")
 
@@ -66,16 +141,27 @@ class EmailCheck(TextCheck):
     :param allow_blank: allows an empty or blank string instead of an email address
     :type allow_blank: boolean (default False)
     """
-    _emailMatch = re.compile(r'\S+@\S+\.\S+')
+    email_pattern = r'\S+@\S+\.\S+'
+    _settings = TextCheck._settings + ('email_pattern', 'allow_none',
+        'allow_blank')
 
     def __init__(self, name, **kwargs):
         self.allow_none = kwargs.pop('allow_none', True)
         self.allow_blank = kwargs.pop('allow_blank', False)
 
         TextCheck.__init__(self, name, **kwargs)
-        self.pattern = r'\S+@\S\.\S'
+        if self.pattern is None:
+            self.pattern = self.email_pattern
         self._object_atts.extend(['allow_none', 'allow_blank'])
 
+    def _compile_pattern(self):
+        # with no pattern, addresses are checked against email_pattern
+        if self._pattern is None:
+            pattern = self.email_pattern
+        else:
+            pattern = self._pattern
+        self._regex = compile_pattern(pattern, self._full_match)
+
     def check_content(self, item):
         ok = None
         if item in [None, 'None', 'none']:
@@ -96,7 +182,7 @@ class EmailCheck(TextCheck):
                     raise self.error("Blank email not allowed")
 
         if ok is None:
-            if  self._emailMatch.match( item) :
+            if  self._regex.match( item) :
                 ok = True
             else:
                 ok = False
@@ -113,6 +199,14 @@ class EmailCheck(TextCheck):
     def dummy_value(self):
         return "me@example.com"
 
+# http and https URLs with a plain host part. A match always has a netloc,
+# so these skip urlsplit. Hosts with [ or ] and anything else are parsed.
+_http_url = re.compile(r"https?://[-A-Za-z0-9._~%!$&'()*+,;=:@]+(?:[/?#]|\Z)",
+    re.IGNORECASE)
+
+# url -> whether urlsplit found a netloc, for the URLs the regex skips
+_url_cache = LRUCache(4096)
+
 class URLCheck(TextCheck):
     """UrlCheck(name [, allow_none, allow_blank])
     Creates a checker specializing in URLs
@@ -123,8 +217,11 @@ class URLCheck(TextCheck):
     :type allow_blank: boolean (default False)
 
     This checker uses the :py:mod:``urlparse`` module from the Python
-    distribution.
+    distribution. Common http and https URLs are recognised without parsing
+    them, and the results for other URLs are cached.
     """
+    _settings = TextCheck._settings + ('allow_none', 'allow_blank')
+
     def __init__(self, name, **kwargs):
         self.allow_none = kwargs.pop('allow_none', True)
         self.allow_blank = kwargs.pop('allow_blank', False)
@@ -150,12 +247,14 @@ class URLCheck(TextCheck):
                     ok = False
                     raise self.error, "Blank url not allowed"
         if ok is None:
-            from urlparse import urlparse
-            parsed_url = urlparse(item)
-            if parsed_url.netloc:
+            if _http_url.match(item) is not None:
                 ok = True
             else:
-                ok = False
+                ok = _url_cache.get(item)
+                if ok is None:
+                    ok = bool(urlsplit(item).netloc)
+                    _url_cache[item] = ok
+            if not ok:
                 raise self.error(
                     "%sCheck failed to match %s" % (self.name, item) )
         if ok:
@@ -245,6 +344,38 @@ class TextCheckTC(unittest.TestCase):
         t = TextCheck('test', pattern=r'\S+@\S+\.\S+')
         self.assertRaises(t.error, t, 'english @ spiritone.com')
 
+    def testFullMatch(self):
+        "TextCheck() with full_match requires the whole string to match"
+        t = TextCheck('test', pattern=r'\d+', full_match=True)
+        self.failUnless(t('1234'))
+        self.assertRaises(t.error, t, '1234a')
+        self.failUnless(TextCheck('test', pattern=r'\d+')('1234a'))
+
+    def testSharedPattern(self):
+        "TextCheck shares compiled patterns between checkers"
+        a = TextCheck('a', pattern=r'[a-z]+\d')
+        b = TextCheck('b', pattern=r'[a-z]+\d')
+        self.assertTrue(a._regex is b._regex)
+        c = TextCheck('c', pattern=r'[a-z]+\d', full_match=True)
+        self.assertFalse(a._regex is c._regex)
+
+    def testChangePattern(self):
+        "TextCheck compiles the pattern again when it changes"
+        t = TextCheck('test', pattern=r'^a')
+        t.pattern = r'^b'
+        self.failUnless(t('bc'))
+        self.assertRaises(t.error, t, 'ac')
+        t.pattern = None
+        self.failUnless(t('ac'))
+
+    def testPickle(self):
+        "TextCheck shares the compiled pattern after unpickling"
+        import pickle
+        t = TextCheck('test', pattern=r'x+y', full_match=True)
+        copy = pickle.loads(pickle.dumps(t))
+        self.assertTrue(copy._regex is t._regex)
+        self.assertRaises(copy.error, copy, 'xxyz')
+
     def testNormalization(self):
         self.assertEqual(self.t('Joshua', normalize=True), "Joshua",
             "TextCheck not normalizing properly")
@@ -284,6 +415,12 @@ class EmailCheckTC(unittest.TestCase):
         "EmailCheck() fails if email is blank and allow_blank is False"
         self.assertRaises(self.t.error, self.t, '')
 
+    def testPattern(self):
+        "EmailCheck uses its email pattern"
+        self.assertEqual(self.t.pattern, EmailCheck.email_pattern)
+        self.assertRaises(self.t.error, self.t, 'english@example')
+        self.assertRaises(self.t.error, self.t, 'english at example.com')
+
     def testCustomAllowNone(self):
         "EmailCheck handles allow_none=False"
         self.failIf(self.n.allow_none)
@@ -300,6 +437,39 @@ class EmailCheckTC(unittest.TestCase):
         "EmailCheck() allows an empty string if allow_blank is true"
         self.failUnless(self.b(' '))
 
+class URLCheckTC(unittest.TestCase):
+    def setUp(self):
+        self.u = URLCheck('url')
+
+    def testPassWithURL(self):
+        "URLCheck() accepts URLs with a network location"
+        for url in ['http://www.example.com', 'HTTPS://example.com:8080/a?b#c',
+                'ftp://user@example.com/file', '//example.com/path']:
+            self.failUnless(self.u(url), url)
+
+    def testFailWithoutNetloc(self):
+        "URLCheck() fails if the URL has no network location"
+        for url in ['www.example.com', 'http:/example.com', 'mailto:me@a.com',
+                'http://', 'http:///path']:
+            self.assertRaises(self.u.error, self.u, url)
+
+    def testBrokenIPv6(self):
+        "URLCheck() leaves bracketed hosts to urlsplit"
+        self.failUnless(self.u('http://[::1]:80/'))
+        self.assertRaises(ValueError, self.u, 'http://[::1/')
+
+    def testNoneAndBlank(self):
+        "URLCheck() accepts None by default, but not blank strings"
+        self.failUnless(self.u('None'))
+        self.assertRaises(self.u.error, self.u, ' ')
+        self.failUnless(URLCheck('url', allow_blank=True)(' '))
+
+    def testRepeatedURL(self):
+        "URLCheck() gives the same answer for a cached URL"
+        for n in range(2):
+            self.failUnless(self.u('ftp://example.com'))
+            self.assertRaises(self.u.error, self.u, 'ftp:example.com')
+
 if __name__=='__main__':
 ##    logger = logging.getLogger()
 ##    logger.setLevel(logging.CRITICAL)
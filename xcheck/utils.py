@@ -13,6 +13,11 @@ except ImportError:
     import xml.etree.ElementTree as ET
 
 #utility functions
+
+# lowercase text -> boolean, shared by get_bool, BoolCheck and the loader
+BOOL_TOKENS = dict.fromkeys(['true', 'yes', '1', 't', 'y'], True)
+BOOL_TOKENS.update(dict.fromkeys(['false', 'no', '0', 'f', 'n'], False))
+
 def get_bool(item):
     """get_bool(item)
     Return True if item is a Boolean True, 1, Yes, T, or Y
@@ -22,12 +27,10 @@ def get_bool(item):
     get_bool() is case-insensitive.
     get_bool() raises a :py:exc:ValueError if item cannot be parsed.
     """
-
-    if str(item).lower() in ['true','yes','1','t','y']:
-        return True
-    if str(item).lower() in ['false', 'no', '0', 'f', 'n']:
-        return False
-    raise ValueError("'%s' cannot be parsed into a boolean value" % item)
+    try:
+        return BOOL_TOKENS[str(item).lower()]
+    except KeyError:
+        raise ValueError("'%s' cannot be parsed into a boolean value" % item)
 
 def get_elem(elem):
     """Assume an ETree.Element object or a string representation.
@@ -113,6 +116,79 @@ def get_minimum_keys(checker):
                 res['.'.join(tokens)] = xpath_to(key)
     return res
 
+#-------------------------------------------------------------------------------
+# caching
+
+import threading
+
+class LRUCache(object):
+    """LRUCache([maxsize=1024])
+    A dictionary-like cache that keeps the most recently used maxsize items.
+    It is safe to share between threads. A maxsize of 0 caches nothing.
+
+    cache.get(key, default) returns the value and marks it as recently used.
+    cache[key] = value adds a value, dropping the least recently used item
+    if the cache is full.
+    """
+    def __init__(self, maxsize=1024):
+        self.maxsize = int(maxsize)
+        self._lock = threading.Lock()
+        self.clear()
+
+    def clear(self):
+        """empties the cache"""
+        with self._lock:
+            # links are [prev, next, key, value] in a circular list around
+            # the root, most recently used last
+            self._root = root = []
+            root[:] = [root, root, None, None]
+            self._links = {}
+
+    def get(self, key, default=None):
+        with self._lock:
+            link = self._links.get(key)
+            if link is None:
+                return default
+            prev, next_ = link[0], link[1]
+            prev[1] = next_
+            next_[0] = prev
+            root = self._root
+            last = root[0]
+            last[1] = root[0] = link
+            link[0] = last
+            link[1] = root
+            return link[3]
+
+    def __setitem__(self, key, value):
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            links = self._links
+            if key in links:
+                links[key][3] = value
+                return
+            root = self._root
+            if len(links) >= self.maxsize:
+                oldest = root[1]
+                root[1] = oldest[1]
+                oldest[1][0] = root
+                del links[oldest[2]]
+            last = root[0]
+            last[1] = root[0] = links[key] = [last, root, key, value]
+
+    def __contains__(self, key):
+        return key in self._links
+
+    def __len__(self):
+        return len(self._links)
+
+    def __getstate__(self):
+        # locks cannot be pickled, so a copy starts empty
+        return {'maxsize': self.maxsize}
+
+    def __setstate__(self, state):
+        self.__init__(state['maxsize'])
+
 #-------------------------------------------------------------------------------
 # logging help
 
@@ -1,18 +1,256 @@
+import re
 from functools import partial
 from operator import attrgetter, methodcaller
 
-from core import ET
+from core import ET, XCheck, call_context
+from memo import check_content
 from utils import get_elem
 
-##class Descriptor(object):
-##    def __init__(self, instance, name):
-##        self._instance = instance
-##        self._name = name
-##    def __get__(self):
-##        return self._instance._get_elem_value(self.name)
+# marks a value that is not in a wrap's cache, or was not found
+_MISSING = object()
+
+_simple_tag = re.compile(r'[A-Za-z_][\w-]*\Z')
+
+def _parse_xpath(xpath):
+    """returns (tags, attribute) for a path like ./a/b or ./a/b[@c], or None
+    for anything else"""
+    att = None
+    if xpath.endswith(']'):
+        xpath, _, att = xpath[:-1].partition('[@')
+        if not _simple_tag.match(att):
+            return None
+    steps = xpath.split('/')
+    if steps[0] != '.':
+        return None
+    for tag in steps[1:]:
+        if not _simple_tag.match(tag):
+            return None
+    return tuple(steps[1:]), att
+
+def _find(elem, tags, att, depth=0):
+    """returns the first element elem.find(xpath) would, by walking the
+    children instead of going through ElementPath"""
+    if depth == len(tags):
+        if att is None or elem.get(att) is not None:
+            return elem
+        return None
+    tag = tags[depth]
+    for child in elem:
+        if child.tag == tag:
+            found = _find(child, tags, att, depth + 1)
+            if found is not None:
+                return found
+    return None
+
+def _findall(elem, tags, att):
+    """returns the elements elem.findall(xpath) would, in the same order"""
+    found = [elem]
+    for tag in tags:
+        found = [child for parent in found for child in parent
+            if child.tag == tag]
+    if att is not None:
+        found = [each for each in found if each.get(att) is not None]
+    return found
+
+class Field(object):
+    """Field(checker, token)
+    The accessor for one element or attribute of a wrapped node. Wrap
+    generates a subclass with a Field for each of the checker's tokens, so
+    the xpath and the checker are worked out once per checker, not on every
+    access. A Field returns what Wrap.__getattr__ would.
+    """
+    def __init__(self, checker, token):
+        info = checker.path_info(token)
+        self.name = token
+        self.xpath = info.xpath
+        self.is_att = info.is_att
+        self.checker = info.checker
+        self.many = info.checker.max_occurs > 1
+        self.has_children = info.checker.has_children
+        self.generation = checker._generation
+        self.path = _parse_xpath(self.xpath)
+
+    def find(self, elem):
+        """returns the first element the field selects, or None"""
+        if self.path is None:
+            return elem.find(self.xpath)
+        return _find(elem, self.path[0], self.path[1])
+
+    def findall(self, elem):
+        """returns the elements the field selects"""
+        if self.path is None:
+            return elem.findall(self.xpath)
+        return _findall(elem, self.path[0], self.path[1])
+
+    def __get__(self, wrap, cls):
+        if wrap is None:
+            return self
+        if not wrap._validated:
+            wrap._validate()
+        if self.generation != wrap._checker._generation:
+            # the schema changed after the class was generated
+            return Wrap.__getattr__(wrap, self.name)
+        if self.many and not self.is_att:
+            items = self.findall(wrap._elem)
+            if not items:
+                return None
+            if self.has_children:
+                return [wrap._cached_wrap(self.checker, self.name, idx, item)
+                    for idx, item in enumerate(items)]
+            return [item.text for item in items]
+
+        node = self.find(wrap._elem)
+        if node is None:
+            return None
+        if self.is_att:
+            return node.get(self.name)
+        if self.has_children:
+            return wrap._cached_wrap(self.checker, self.name, 0, node)
+        return node.text
+
+def _normalized(context, checker, value, normalize):
+    """returns the text or attribute value checked and normalized by the
+    checker in the given call context, without trying to parse it as XML
+    first like a call does. Returns True if normalize is false, like a
+    call."""
+    context.values.pop(id(checker), None)
+    check_content(checker, value)
+    if normalize:
+        return checker._normalized_value
+    return True
+
+def _walk(elem, trie, raw):
+    """fills raw with the text and attribute values a Projection reads
+    under elem"""
+    for child in elem:
+        node = trie.get(child.tag)
+        if node is None:
+            continue
+        subtrie, slots = node
+        for idx, att, many in slots:
+            if att is None:
+                value = child.text
+            else:
+                value = child.get(att)
+                if value is None:
+                    continue
+            if many:
+                if raw[idx] is _MISSING:
+                    raw[idx] = [value]
+                else:
+                    raw[idx].append(value)
+            elif raw[idx] is _MISSING:
+                raw[idx] = value
+        if subtrie:
+            _walk(child, subtrie, raw)
+
+class Projection(object):
+    """Projection(checker, [names])
+    Reads the normalized values of several elements and attributes in one
+    walk of a node. The paths are worked out once and kept in a tree of
+    tags, so the walk only goes into the elements that hold a value. With
+    no names, reads every element and attribute without children, leaving
+    out names that appear in more than one place.
+
+    Each value is what Wrap._get_elem_value or Wrap._get_att gives for
+    the field, using the same call options. Elements the checker allows
+    more than once give a list, and missing ones give None, like the fields
+    of a Wrap.
+    """
+    def __init__(self, checker, names=None):
+        tokens = checker.tokens()
+        if names is None:
+            names = []
+            for token in tokens:
+                info = checker.path_info(token)
+                if info.checker is not None and (info.is_att
+                        or not info.checker.has_children):
+                    names.append(token)
+        self.names = tuple(names)
+        self.generation = checker._generation
+        self.checks = []
+        self.root = []
+        self.trie = {}
+        self.fallback = []
+        tokens = set(tokens)
+        for idx, name in enumerate(self.names):
+            if name not in tokens:
+                raise ValueError("Invalid tag name by checker: %s" % name)
+            if checker.path_info(name).checker is None:
+                raise ValueError("%s appears in more than one place" % name)
+            field = Field(checker, name)
+            if field.has_children and not field.is_att:
+                raise ValueError("%s has children, not a value" % name)
+            many = field.many and not field.is_att
+            # the options a getter's call uses, not the checker's settings
+            options, kwargs = field.checker._call_options({'normalize': True})
+            self.checks.append((field.checker, many, options,
+                kwargs['normalize']))
+            if field.path is None:
+                self.fallback.append((idx, field))
+                continue
+            tags, att = field.path
+            if not tags:
+                self.root.append((idx, att))
+                continue
+            trie = self.trie
+            for tag in tags[:-1]:
+                trie = trie.setdefault(tag, ({}, []))[0]
+            trie.setdefault(tags[-1], ({}, []))[1].append((idx, att, many))
+
+    def read(self, elem):
+        """returns a tuple of the normalized values under elem"""
+        raw = [_MISSING] * len(self.names)
+        for idx, att in self.root:
+            value = elem.text if att is None else elem.get(att)
+            if value is not None or att is None:
+                raw[idx] = value
+        _walk(elem, self.trie, raw)
+        for idx, field in self.fallback:
+            if field.is_att:
+                node = field.find(elem)
+                if node is not None:
+                    raw[idx] = node.get(field.name)
+            elif field.many:
+                raw[idx] = [node.text for node in field.findall(elem)] or \
+                    _MISSING
+            else:
+                node = field.find(elem)
+                if node is not None:
+                    raw[idx] = node.text
+
+        values = []
+        # one context for every value, pointed at each checker in turn
+        with call_context(None) as context:
+            for value, (checker, many, options, normalize) in zip(raw,
+                    self.checks):
+                if value is _MISSING:
+                    values.append(None)
+                    continue
+                context.checker = checker
+                context.options = options
+                if many:
+                    values.append([_normalized(context, checker, each,
+                        normalize) for each in value])
+                else:
+                    values.append(_normalized(context, checker, value,
+                        normalize))
+        return tuple(values)
+
+_validate_modes = ('eager', 'lazy', 'trusted')
+
+def _options_key(kwargs):
+    """returns a dictionary key for a getter's call options, or None if the
+    options cannot be one"""
+    key = tuple(sorted(kwargs.items())) if kwargs else ()
+    try:
+        hash(key)
+    except TypeError:
+        return None
+    return key
 
 class Wrap(object):
-    """Wrap(checker, element)
+    """Wrap(checker, element, [validate='eager'])
     Creates a object Wrapper around an element that must validate to the
     checker object.
 
@@ -20,51 +258,234 @@ class Wrap(object):
     :type checker: XCheck
     :param element: Data to be wrapped
     :type element: ElementTree.Element, a string representation, or None
+    :param validate: when the element is checked
+    :type validate: 'eager', 'lazy' or 'trusted'
+
+    An eager wrap checks the element when it is created. A lazy wrap checks
+    it the first time a value is read or set, or when :meth:`_validate` is
+    called. A trusted wrap never checks it. Child wraps are created trusted,
+    since the parent has already been checked, unless the child's tag does
+    not match its checker or a child was added with _add_elem since then.
+
+    Child wraps are kept by tag and index, so reading ``person.address``
+    again returns the same wraps. The _set_ and _add_ methods drop them.
+
+    The normalized values returned by _get_att, _get_elem_value and
+    _get_elem_att are kept too, until the value is set through this wrap or
+    anything is set through another wrap of the same tree. Call _changed()
+    after changing the element directly.
+
+    :meth:`_project` and :meth:`_to_record` read many values in one walk of
+    the element.
 
     The instance has a custom __getattr__ method. The results could be a string,
     a list of strings, a list of wrapped objects, or None.
 
     If the element is a singleton with data, the text is returned.
 
+    The instance's class is a subclass of the class Wrap was called with,
+    generated once per checker, with a Field for each token. Names the class
+    already has, like a property in a subclass of Wrap, are left alone.
     """
-    def __init__(self, ch, elem=None):
+    # True on the generated subclasses
+    _generated = False
+    # True once the element has been checked, or if it is trusted
+    _validated = False
+    # True if child wraps can be created trusted. _add_elem clears it
+    _trust_children = False
+
+    def __init__(self, ch, elem=None, validate='eager'):
+        if validate not in _validate_modes:
+            raise ValueError("validate must be one of %s, not %r" %
+                (', '.join(_validate_modes), validate))
         self._checker = ch
         if elem is None:
             elem = ch.dummy_element()
         else:
             elem = get_elem(elem)
         self._elem = elem
+        self._child_wraps = {}
+        # normalized values by (tag, nth, att), then by call options
+        self._values = {}
+        # the change count, shared by the wraps of one tree, and the count
+        # the values were cached at
+        self._tree = [0]
+        self._version = 0
+        if validate == 'eager':
+            self._validate()
+        elif validate == 'trusted':
+            self._validated = True
+            self._trust_children = True
+        self.__class__ = self._wrap_class(ch)
+
+    def _validate(self):
+        """_validate()
+        Checks the element against the checker, even if it has been checked
+        before. Raises an XCheckError if the element is not valid.
+        """
         self._checker(self._elem)
-##        # experimental stuff
-##
-##        for child in self._checker.children:
-##            if child.max_occurs == 1:
-####                print "setting %s attribute" % child.name
-####                getter = partial(self._get_elem_value, child.name)
-####                setter = partial(self._set_elem_value, child.name)
-####                prop = property(getter, setter)
-##                if child.has_children:
-##                    pass
-##                else:
-##
-##                    setattr(self, child.name, Descriptor(self, child.name))
+        self._validated = True
+        self._trust_children = True
+
+    def _changed(self):
+        """_changed()
+        Drops the cached child wraps and values. Called after the element is
+        changed.
+        """
+        self._child_wraps.clear()
+        self._values.clear()
+        self._tree[0] += 1
+        self._version = self._tree[0]
+
+    def _wrote(self, *keys):
+        """_wrote(key, ...)
+        Drops the cached child wraps and the values cached for each
+        (tag, nth, att) key, after those values are set.
+        """
+        values = self._cached_values()
+        for key in keys:
+            values.pop(key, None)
+        self._child_wraps.clear()
+        self._tree[0] += 1
+        self._version = self._tree[0]
+
+    def _cached_values(self):
+        """returns the value cache, emptied first if another wrap of the
+        same tree has changed it"""
+        if self._version != self._tree[0]:
+            self._values.clear()
+            self._version = self._tree[0]
+        return self._values
+
+    def _cached_value(self, key, kwargs):
+        """returns the value cached for key and the call options, or
+        _MISSING"""
+        field = self._cached_values().get(key)
+        if field is None:
+            return _MISSING
+        value = field.get(_options_key(kwargs), _MISSING)
+        if type(value) is list:
+            value = value[:]
+        return value
+
+    def _cache_value(self, key, kwargs, value):
+        """keeps value for key and the call options, and returns it"""
+        options = _options_key(kwargs)
+        if options is not None:
+            self._cached_values().setdefault(key, {})[options] = \
+                value[:] if type(value) is list else value
+        return value
+
+    def _cached_wrap(self, checker, tag, nth, elem):
+        """_cached_wrap(checker, tag, nth, elem)
+        Returns the wrap for elem, the nth tag element, from the cache if it
+        is still there and wraps the same element. A new wrap is trusted
+        only if this wrap's check covered elem, and checked otherwise.
+        """
+        key = (tag, nth)
+        child = self._child_wraps.get(key)
+        if child is None or child._elem is not elem or \
+                child._checker is not checker:
+            if self._trust_children and elem.tag == checker.name:
+                mode = 'trusted'
+            else:
+                mode = 'eager'
+            child = self._child_wraps[key] = Wrap(checker, elem, mode)
+            # a change through either wrap is seen by the other
+            child._tree = self._tree
+            child._version = self._tree[0]
+        return child
+
+    @classmethod
+    def _wrap_class(cls, checker):
+        """_wrap_class(checker)
+        Returns the generated subclass of cls for the checker. The class is
+        kept on the checker until the schema changes. Names that appear in
+        more than one place have no single checker, so they get no Field
+        and are left to __getattr__.
+        """
+        if cls._generated:
+            cls = cls.__bases__[0]
+        classes = checker.__dict__.setdefault('_wrap_classes', {})
+        found = classes.get(cls)
+        if found is not None and found[0] == checker._generation:
+            return found[1]
+
+        namespace = {'__module__': cls.__module__, '__doc__': cls.__doc__,
+            '_generated': True, '_projections': {}}
+        for token in checker.tokens():
+            if token in namespace or hasattr(cls, token):
+                continue
+            if checker.path_info(token).checker is not None:
+                namespace[token] = Field(checker, token)
+        generated = type(cls.__name__, (cls,), namespace)
+        classes[cls] = (checker._generation, generated)
+        return generated
+
+    def _project(self, names, as_dict=False):
+        """_project(names, [as_dict=False])
+        Returns the normalized values of the named elements and attributes
+        as a tuple in the same order, or as a dictionary if as_dict is true.
+        The values are read in one walk of the element. Raises a ValueError
+        if a name is not in the checker, appears in more than one place, or
+        is an element with children.
+        """
+        if not self._validated:
+            self._validate()
+        names = tuple(names)
+        values = self._projection(names).read(self._elem)
+        if as_dict:
+            return dict(zip(names, values))
+        return values
+
+    def _to_record(self):
+        """_to_record()
+        Returns a dictionary of the normalized values of every element and
+        attribute without children, read in one walk of the element. Names
+        that appear in more than one place are left out.
+        """
+        if not self._validated:
+            self._validate()
+        projection = self._projection(None)
+        return dict(zip(projection.names, projection.read(self._elem)))
+
+    def _projection(self, names):
+        """returns the Projection of names for the checker, kept on the
+        generated class until the schema changes"""
+        found = self._projections.get(names)
+        if found is None or found.generation != self._checker._generation:
+            found = self._projections[names] = Projection(self._checker, names)
+        return found
 
     def _get_att(self, att_name, normalize=True, **kwargs):
         """_get_att(name, [normalize=True]
         Return the value of the node attribute"""
+        if not self._validated:
+            self._validate()
+        if normalize:
+            value = self._cached_value((None, 0, att_name), kwargs)
+            if value is not _MISSING:
+                return value
         if att_name not in self._checker.tokens():
             raise ValueError, "%s is not a valid attribute name" % att_name
 
         attcheck = self._checker.get(att_name)
 
-        return attcheck(self._elem.get(att_name), normalize=normalize, **kwargs)
+        value = attcheck(self._elem.get(att_name), normalize=normalize,
+            **kwargs)
+        if normalize:
+            self._cache_value((None, 0, att_name), kwargs, value)
+        return value
 
     def _set_att(self, att_name, value):
+        if not self._validated:
+            self._validate()
         if att_name not in self._checker.tokens():
             raise ValueError, "%s is not a valid attribute name" % att_name
         attcheck = self._checker.get(att_name)
         val = attcheck(value, normalize=True, as_string=True)
-        return self._elem.set(att_name, val)
+        self._elem.set(att_name, val)
+        self._wrote((None, 0, att_name), (self._elem.tag, 0, att_name))
 
     def _get_elem_value(self, tag_name, nth = 0, normalize=True, **kwargs):
         """get_list_elem_text(tag_name, nth, normalize)
@@ -76,6 +497,12 @@ class Wrap(object):
 
         If normalize is False, returns the text value as it appears
         """
+        if not self._validated:
+            self._validate()
+        if normalize:
+            value = self._cached_value((tag_name, nth, None), kwargs)
+            if value is not _MISSING:
+                return value
         if tag_name not in self._checker.tokens():
             raise ValueError("Invalid tag name by checker: %s" % tag_name)
 
@@ -90,7 +517,7 @@ class Wrap(object):
         xpth = self._checker.xpath_to(tag_name)
         children = list(self._elem.findall(xpth))
         if len(children) == 0 and childcheck.min_occurs ==0:
-            return ''
+            return self._cache_value((tag_name, nth, None), kwargs, '')
         if nth >= len(children):
             raise IndexError("index %d out of range of children" % nth)
 
@@ -98,7 +525,8 @@ class Wrap(object):
 
         # if nth isn't a valid integer this will raise a type error
         if normalize:
-            return childcheck(children[nth].text, normalize=normalize, **kwargs)
+            return self._cache_value((tag_name, nth, None), kwargs,
+                childcheck(children[nth].text, normalize=normalize, **kwargs))
         else:
             return children[nth].text
 
@@ -108,6 +536,8 @@ class Wrap(object):
 
         Value will be converted to a string.
         """
+        if not self._validated:
+            self._validate()
         if tag_name not in self._checker.tokens():
             raise ValueError("%s is not a valid tag in the checker" % tag_name)
 
@@ -129,12 +559,19 @@ class Wrap(object):
         childcheck(value)
 
         children[nth].text = str(value)
+        self._wrote((tag_name, nth, None))
 
 
     def _get_elem_att(self, tag, att, nth=0, normalize=True, **kwargs):
         """_get_elem_att(tag, att)
         returns the attribute value for the given tag.
         """
+        if not self._validated:
+            self._validate()
+        if normalize:
+            value = self._cached_value((tag, nth, att), kwargs)
+            if value is not _MISSING:
+                return value
         if tag not in self._checker.tokens():
             raise ValueError("'%s' is not a valid element tag" % tag)
         if att not in self._checker.tokens():
@@ -156,9 +593,12 @@ class Wrap(object):
             elem = elist[nth]
 
         if elem.get(att) is None:
-            return None
+            value = None
         else:
-            return attcheck(elem.get(att), normalize=normalize, **kwargs)
+            value = attcheck(elem.get(att), normalize=normalize, **kwargs)
+        if normalize:
+            self._cache_value((tag, nth, att), kwargs, value)
+        return value
         #~ return elem.get(att)
 
     def _set_elem_att(self, tag, att, value, nth = 0):
@@ -171,6 +611,8 @@ class Wrap(object):
             * The attribute is not an attribute of the given tag
             * The value is not acceptable according to the checker definition
         """
+        if not self._validated:
+            self._validate()
         if tag not in self._checker.tokens():
             raise ValueError, "'%s' is not a valid element tag" % tag
         if att not in self._checker.tokens():
@@ -193,6 +635,10 @@ class Wrap(object):
         else:
             elem = elist[nth]
         elem.set(att, str(value))
+        if elem is self._elem:
+            self._wrote((tag, nth, att), (None, 0, att))
+        else:
+            self._wrote((tag, nth, att))
 
     def _add_elem(self, tag_name, text, attrib=None):
         """_add_elem(tag_name, text, attrib=None)
@@ -200,6 +646,8 @@ class Wrap(object):
         Raises an IndexError if the checker does not allow an addition child
         of tag_name.
         """
+        if not self._validated:
+            self._validate()
         if attrib is None:
             attrib = {}
         last_child = None
@@ -220,6 +668,10 @@ class Wrap(object):
                 self._elem._children.index(last_child)+1,
                 new_child)
         new_child.text = str(text)
+        # the new child has not been checked, so child wraps are checked
+        # when they are created
+        self._trust_children = False
+        self._changed()
 
         return new_child
 
@@ -227,6 +679,8 @@ class Wrap(object):
         """_get_child_wrap(tag_name, nth=0)
         Returns a wrap object for the nth child node
         """
+        if not self._validated:
+            self._validate()
 
         ch = self._checker.get(tag_name)
 
@@ -235,11 +689,13 @@ class Wrap(object):
         elem = elist[nth]
 
 ##        return self.__class__(ch, elem)
-        return Wrap(ch, elem)
+        return self._cached_wrap(ch, tag_name, nth, elem)
 
     ## new 0.4.7
     def __getattr__(self, prop):
         if prop in self._checker.tokens():
+            if not self._validated:
+                self._validate()
             nm, att = self._checker.path_to(prop)
 ##            print nm, att
             xpth = self._checker.xpath_to(prop)